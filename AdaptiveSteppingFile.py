@@ -0,0 +1,219 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from FeederFile import (Feeder, MAX_SPEED, FOOD_SENSOR_RADIUS, DANGER_SENSOR_RADIUS, CONSUMPTION_PER_SECOND)
+from ProximityFile import find_near_pairs
+
+MAX_COAST_STEPS = 32  # the most animation steps a feeder may skip at once; bounds how far to look for food and dangers.
+
+
+def replay_steps(food_levels: np.ndarray, ages: np.ndarray, positions: np.ndarray, orientations: np.ndarray,
+                 speeds: np.ndarray, turn_ratios: np.ndarray, delta_t: float,
+                 num_steps: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    takes feeders whose brains leave their speed and turn ratio alone throughout through num_steps animation steps,
+    all at once. Each step repeats Feeder.animation_step()'s float operations in the same order - eat, check for
+    starvation, age, turn half a step, move, turn the other half - so the results are the same as stepping, to the bit
+    (as long as NumPy's sine and cosine agree with the math module's).
+    :param food_levels: the feeders' food levels
+    :param ages: their ages
+    :param positions: their (N x 2) locations
+    :param orientations: their headings
+    :param speeds: their speeds
+    :param turn_ratios: their turn ratios
+    :param delta_t: the number of seconds per animation step
+    :param num_steps: how many steps each feeder takes, at most MAX_COAST_STEPS
+    :return: the feeders' food levels, ages, locations and headings after their steps, and which of them starved (a
+    feeder that starves stops where it was, as Feeder.animation_step() leaves it).
+    """
+    food_levels, ages, orientations = food_levels.copy(), ages.copy(), orientations.copy()
+    xs, ys = positions[:, 0].copy(), positions[:, 1].copy()
+    starved = np.zeros(len(food_levels), dtype=bool)
+    for step in range(int(num_steps.max(initial=0))):
+        stepping = (step < num_steps) & ~starved
+        food_levels = np.where(stepping, food_levels - CONSUMPTION_PER_SECOND * delta_t, food_levels)
+        starved |= stepping & (food_levels < 0)
+        stepping &= ~starved
+        ages = np.where(stepping, ages + delta_t, ages)
+        orientations = np.where(stepping, orientations + turn_ratios * delta_t / 2, orientations)
+        xs = np.where(stepping, xs + speeds * delta_t * np.cos(orientations), xs)
+        ys = np.where(stepping, ys + speeds * delta_t * np.sin(orientations), ys)
+        orientations = np.where(stepping, orientations + turn_ratios * delta_t / 2, orientations)
+    return food_levels, ages, np.stack((xs, ys), axis=1), orientations, starved
+
+
+def fed_steps(food_levels: np.ndarray, delta_t: float) -> np.ndarray:
+    """
+    :param food_levels: the food levels of some feeders that find nothing to eat
+    :param delta_t: the number of seconds per animation step
+    :return: how many more steps each feeder lives through before it starves on the next, counting the food the same
+    way Feeder.animation_step() does; at most MAX_COAST_STEPS.
+    """
+    steps = np.zeros(len(food_levels), dtype=int)
+    for _ in range(MAX_COAST_STEPS):
+        food_levels = food_levels - CONSUMPTION_PER_SECOND * delta_t
+        steps += food_levels >= 0
+    return steps
+
+
+def nearest_distances(positions: np.ndarray, targets: np.ndarray, search_radius: float) -> np.ndarray:
+    """
+    :param positions: the (N x 2) locations of some feeders
+    :param targets: the (M x 2) locations of some food or dangers
+    :param search_radius: how far to look
+    :return: each feeder's distance to its nearest target, or infinity if none is within search_radius.
+    """
+    nearest_squared = np.full(len(positions), np.inf)
+    rows, _, squared = find_near_pairs(positions, targets, search_radius ** 2)
+    np.minimum.at(nearest_squared, rows, squared)
+    return np.sqrt(nearest_squared)
+
+
+def safe_coast_steps(positions: np.ndarray, speeds: np.ndarray, food_levels: np.ndarray, food_positions: np.ndarray,
+                     danger_positions: np.ndarray, max_danger_speed: float, delta_t: float) -> np.ndarray:
+    """
+    works out how many animation steps each of some feeders, none of which senses anything right now, can skip
+    without missing anything: until food could come within sensing range (food stays put, so only the feeder's own
+    speed counts), until a danger could (the feeder's speed plus that of the fastest danger), or until the feeder would
+    starve. Until then its sensors stay at zero, so its brain - which has no bias terms - keeps its speed and turn
+    ratio as they are, and it coasts. One step is kept in hand against rounding in the distances; the step on which
+    it would starve is found exactly (with fed_steps()), so that it starves on that step by stepping normally.
+    :param positions: the (N x 2) locations of the feeders
+    :param speeds: their speeds
+    :param food_levels: their food levels
+    :param food_positions: the (M x 2) locations of the food
+    :param danger_positions: the (K x 2) locations of all the dangers, moving or not
+    :param max_danger_speed: the speed of the fastest danger
+    :param delta_t: the number of seconds per animation step
+    :return: how many steps each feeder can skip, at most MAX_COAST_STEPS.
+    """
+    lookahead = MAX_COAST_STEPS * delta_t
+    speeds = np.abs(speeds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        food_time = (nearest_distances(positions, food_positions, FOOD_SENSOR_RADIUS + MAX_SPEED * lookahead)
+                     - FOOD_SENSOR_RADIUS) / speeds
+        danger_time = (nearest_distances(positions, danger_positions,
+                                         DANGER_SENSOR_RADIUS + (MAX_SPEED + max_danger_speed) * lookahead)
+                       - DANGER_SENSOR_RADIUS) / (speeds + max_danger_speed)
+    safe_time = np.fmin(food_time, danger_time)  # fmin: a stationary feeder's 0/0 is NaN.
+    safe_steps = np.clip(np.floor(safe_time / delta_t) - 1, 0, MAX_COAST_STEPS).astype(int)
+    return np.minimum(safe_steps, fed_steps(food_levels, delta_t))
+
+
+class CoastSchedule:
+    """
+    Keeps track of which feeders are coasting - skipping animation steps because nothing is near them - since which
+    step, and for how many. A coasting feeder's attributes stay as they were when it started coasting until it is
+    settled, which replays the skipped steps (with replay_steps()) to bring it up to date.
+    """
+
+    def __init__(self):
+        self.step = 0  # the number of the current animation step.
+        self.delta_t = 0.0  # the length of the steps being skipped; coasting needs every step to be this long.
+        self.start = np.zeros(0, dtype=int)  # per feeder: the first step it skips, or -1 if it isn't coasting.
+        self.length = np.zeros(0, dtype=int)  # per feeder: how many steps it skips.
+
+    def reset(self, population_size: int):
+        """
+        stop tracking the old population and start on a new one, with no-one coasting.
+        :param population_size: the number of feeders in the brain engine's population
+        """
+        self.start = np.full(population_size, -1)
+        self.length = np.zeros(population_size, dtype=int)
+
+    @property
+    def coasting(self) -> np.ndarray:
+        """
+        :return: a boolean array marking the feeders that are coasting.
+        """
+        return self.start >= 0
+
+    def begin(self, indices: np.ndarray, num_steps: np.ndarray, delta_t: float):
+        """
+        start some feeders coasting, skipping this step and the num_steps - 1 after it.
+        :param indices: the feeders' positions in the population
+        :param num_steps: how many steps each one skips
+        :param delta_t: the number of seconds per step
+        """
+        self.delta_t = delta_t
+        self.start[indices] = self.step
+        self.length[indices] = num_steps
+
+    def due(self) -> np.ndarray:
+        """
+        :return: the positions in the population of the feeders that have skipped all their steps by now.
+        """
+        return np.flatnonzero((self.start >= 0) & (self.start + self.length <= self.step))
+
+    def settle(self, population: List[Feeder], indices: np.ndarray, through_step: int) -> List[Feeder]:
+        """
+        brings some coasting feeders up to the end of the given step (or of their coast, if that's sooner), and stops
+        them coasting. Coasts end before the step on which a feeder would starve, so none should starve here; if one
+        does anyway, it dies as it would have while stepping, and is returned for the caller to record.
+        :param population: the brain engine's population
+        :param indices: the positions in the population of the feeders to settle
+        :param through_step: the last step to account for
+        :return: the feeders that starved.
+        """
+        if len(indices) == 0:
+            return []
+        num_steps = np.minimum(self.length[indices], through_step - self.start[indices] + 1)
+        feeders = [population[i] for i in indices.tolist()]
+        food_levels, ages, positions, orientations, starved = replay_steps(
+            np.array([bug.food_level for bug in feeders], dtype=float),
+            np.array([bug.age for bug in feeders], dtype=float),
+            np.array([bug.position for bug in feeders], dtype=float).reshape(-1, 2),
+            np.array([bug.orientation for bug in feeders], dtype=float),
+            np.array([bug.speed for bug in feeders], dtype=float),
+            np.array([bug.turn_ratio for bug in feeders], dtype=float),
+            self.delta_t, num_steps)
+        starved_feeders = []
+        for bug, food_level, age, position, orientation, has_starved in zip(
+                feeders, food_levels.tolist(), ages.tolist(), positions.tolist(), orientations.tolist(),
+                starved.tolist()):
+            bug.food_level = food_level
+            bug.age = age
+            bug.position = position
+            bug.orientation = orientation
+            if has_starved:
+                bug.die()
+                bug.death_reason = "E"
+                starved_feeders.append(bug)
+        self.start[indices] = -1
+        return starved_feeders
+
+    def settle_all(self, population: List[Feeder], through_step: int) -> List[Feeder]:
+        """
+        settles every coasting feeder, as of the end of the given step.
+        :param population: the brain engine's population
+        :param through_step: the last step to account for
+        :return: the feeders that starved.
+        """
+        return self.settle(population, np.flatnonzero(self.coasting), through_step)
+
+    def wake_near(self, population: List[Feeder], new_food_positions: np.ndarray) -> List[Feeder]:
+        """
+        settles (as of the end of this step) the coasting feeders that could come within sensing range of newly placed
+        food before their coast is over, since they didn't allow for it.
+        :param population: the brain engine's population
+        :param new_food_positions: the (M x 2) locations of the new food
+        :return: the feeders that starved.
+        """
+        indices = np.flatnonzero(self.coasting)
+        if len(indices) == 0 or len(new_food_positions) == 0:
+            return []
+        starts = np.array([population[i].position for i in indices.tolist()], dtype=float).reshape(-1, 2)
+        reach = FOOD_SENSOR_RADIUS + np.abs([population[i].speed for i in indices.tolist()]) * self.length[indices] \
+            * self.delta_t
+        distances = nearest_distances(starts, new_food_positions, float(reach.max()))
+        return self.settle(population, indices[distances <= reach], self.step)
+
+
+def fastest_danger_speed(velocities: List[List[float]]) -> float:
+    """
+    :param velocities: the velocities of the moving dangers
+    :return: the speed of the fastest of them (dangers keep their speeds when they bounce).
+    """
+    return max((math.hypot(*velocity) for velocity in velocities), default=0.0)
@@ -0,0 +1,162 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {"identity": lambda x: x,
+                                                               "tanh": np.tanh,
+                                                               "relu": lambda x: np.maximum(x, 0.0)}
+
+
+class BrainArchitecture:
+    """
+    Describes the shape of a feeder's brain: a stack of fully-connected layers that turns the sensor readings into
+    changes of speed and turn ratio. The genes of a feeder are the weights of these layers, laid out layer by layer,
+    each layer as an (outputs x inputs) row-major block. With no hidden layers, this is exactly the original layout:
+    genes 0-31 weigh the food and danger sensors for speed, genes 32-63 weigh them for turning.
+    """
+
+    def __init__(self, num_inputs: int, num_outputs: int = 2, hidden_layers: Sequence[int] = (),
+                 activation: str = "tanh"):
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unknown activation '{activation}'; expected one of {sorted(ACTIVATIONS)}.")
+        self.layer_sizes: List[int] = [num_inputs, *hidden_layers, num_outputs]
+        self.activation = activation
+        self.gene_length = sum(n_in * n_out for n_in, n_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:]))
+
+    def describe(self) -> str:
+        """
+        :return: a short description of this architecture, e.g., "32-8-2 tanh", that parse() can read back.
+        """
+        return f"{'-'.join(str(size) for size in self.layer_sizes)} {self.activation}"
+
+    @staticmethod
+    def parse(description: str) -> "BrainArchitecture":
+        """
+        builds an architecture from a description made by describe().
+        :param description: a string such as "32-8-2 tanh"
+        :return: the architecture it describes.
+        """
+        sizes_text, activation = description.split()
+        sizes = [int(size) for size in sizes_text.split("-")]
+        return BrainArchitecture(num_inputs=sizes[0], num_outputs=sizes[-1], hidden_layers=sizes[1:-1],
+                                 activation=activation)
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, BrainArchitecture) and self.layer_sizes == other.layer_sizes
+                and self.activation == other.activation)
+
+    def weight_matrices(self, genes: np.ndarray) -> List[np.ndarray]:
+        """
+        splits gene rows into the weight matrices of each layer, without copying.
+        :param genes: an (N x gene_length) array, one row of genes per brain
+        :return: a list of (N x outputs x inputs) arrays, one per layer.
+        """
+        matrices = []
+        offset = 0
+        for n_in, n_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            matrices.append(genes[:, offset:offset + n_in * n_out].reshape(-1, n_out, n_in))
+            offset += n_in * n_out
+        return matrices
+
+    def evaluate(self, genes: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        """
+        runs N brains at once. The hidden layers use the activation function; the output layer is linear.
+        :param genes: an (N x gene_length) array, one row of genes per brain
+        :param inputs: an (N x num_inputs) array, one row of sensor readings per brain
+        :return: an (N x num_outputs) array of outputs.
+        """
+        activation = ACTIVATIONS[self.activation]
+        matrices = self.weight_matrices(genes)
+        values = inputs
+        for matrix in matrices[:-1]:
+            values = activation(np.einsum("noi,ni->no", matrix, values))
+        return np.einsum("noi,ni->no", matrices[-1], values)
+
+    def effective_weights(self, genes: Sequence[float]) -> np.ndarray:
+        """
+        collapses one brain into a single (outputs x inputs) matrix by multiplying its layers together, ignoring the
+        activations. This is only an approximation for brains with hidden layers, but it is good enough to draw.
+        :param genes: one brain's genes
+        :return: the (num_outputs x num_inputs) matrix.
+        """
+        matrices = self.weight_matrices(np.asarray(genes, dtype=float).reshape(1, -1))
+        result = matrices[0][0]
+        for matrix in matrices[1:]:
+            result = matrix[0] @ result
+        return result
+
+
+class BrainEngine:
+    """
+    Evaluates the brains of a whole population in one batch. The engine owns an (N x gene_length) gene matrix and an
+    (N x num_inputs) sensor array; each attached feeder's genes, food_sensors and danger_sensors are views into its
+    rows, so feeders share the engine's memory and write their readings straight into the batch.
+
+    The gene matrix is normally allocated afresh by each attach(); use_gene_buffer() makes the engine gather the genes
+    into a given array instead, e.g., one in shared memory that other processes read.
+    """
+
+    def __init__(self, architecture: BrainArchitecture):
+        self.architecture = architecture
+        self.feeders: List = []
+        self.genes = np.zeros((0, architecture.gene_length))
+        self.sensors = np.zeros((0, architecture.layer_sizes[0]))
+        self.gene_buffer: Optional[np.ndarray] = None
+
+    def use_gene_buffer(self, gene_buffer: Optional[np.ndarray]):
+        """
+        makes the gene matrix a view of the given array from now on, and re-attaches the current feeders to it.
+        :param gene_buffer: an (N x gene_length) float array for a population of N feeders, or None to go back to
+        allocating the matrix
+        """
+        if gene_buffer is not None and (gene_buffer.ndim != 2 or gene_buffer.shape[1] != self.architecture.gene_length
+                                        or gene_buffer.dtype != np.float64):
+            raise ValueError(f"A gene buffer for {self.architecture.describe()} brains must be an (N x "
+                             f"{self.architecture.gene_length}) float64 array, not {gene_buffer.shape} "
+                             f"{gene_buffer.dtype}.")
+        self.gene_buffer = gene_buffer
+        self.attach(self.feeders)
+
+    def attach(self, feeders: Sequence):
+        """
+        gathers the genes of the given feeders into one matrix, and points their genes and sensors at its rows and at
+        rows of the sensor array.
+        Call this whenever the population changes; the order of the feeders here is the order of the results of
+        motion_commands().
+        :param feeders: the feeders to evaluate
+        """
+        self.feeders = list(feeders)
+        for bug in self.feeders:
+            if len(bug.genes) != self.architecture.gene_length:
+                raise ValueError(f"{bug.name} has {len(bug.genes)} genes, but a "
+                                 f"{self.architecture.describe()} brain needs {self.architecture.gene_length}.")
+        if self.gene_buffer is None:
+            self.genes = np.array([bug.genes for bug in self.feeders], dtype=float).reshape(
+                len(self.feeders), self.architecture.gene_length)
+        else:
+            if len(self.feeders) != len(self.gene_buffer):
+                raise ValueError(f"The gene buffer holds {len(self.gene_buffer)} feeders, not {len(self.feeders)}.")
+            # the feeders' genes may be rows of the buffer already; gather them first so none is overwritten early.
+            gathered = np.array([bug.genes for bug in self.feeders], dtype=float)
+            self.gene_buffer[:] = gathered.reshape(self.gene_buffer.shape)
+            self.genes = self.gene_buffer[:]  # a view, so that marking it read-only leaves the buffer writable.
+        self.sensors = np.zeros((len(self.feeders), self.architecture.layer_sizes[0]))
+        self.genes.flags.writeable = False
+        half = self.architecture.layer_sizes[0] // 2
+        for i, bug in enumerate(self.feeders):
+            bug.genes = self.genes[i]
+            bug.food_sensors = self.sensors[i, :half]
+            bug.danger_sensors = self.sensors[i, half:]
+
+    def clear_sensors(self):
+        """
+        resets every attached feeder's sensors to zero.
+        """
+        self.sensors.fill(0.0)
+
+    def motion_commands(self) -> List[List[float]]:
+        """
+        evaluates every attached feeder's brain on its current sensor readings.
+        :return: one [change in speed, change in turn ratio] pair per feeder, in the order they were attached.
+        """
+        return self.architecture.evaluate(self.genes, self.sensors).tolist()
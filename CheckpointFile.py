@@ -0,0 +1,68 @@
+import math
+import os
+import random
+from typing import Dict
+
+import numpy as np
+
+CHECKPOINT_SUFFIX = ".checkpoint.npz"
+
+
+def write_checkpoint(filename: str, arrays: Dict[str, np.ndarray]):
+    """
+    writes the given arrays to a checkpoint file atomically: they are written to a temporary file next to the
+    checkpoint, which then replaces it in one step, so a crash mid-write leaves the previous checkpoint intact.
+    :param filename: the checkpoint file to (over)write
+    :param arrays: the named arrays to store
+    """
+    temporary_filename = f"{filename}.tmp"
+    with open(temporary_filename, "wb") as file:
+        np.savez(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_filename, filename)
+
+
+def read_checkpoint(filename: str) -> Dict[str, np.ndarray]:
+    """
+    reads all the arrays from a checkpoint file made by write_checkpoint().
+    :param filename: the checkpoint file
+    :return: the named arrays it holds.
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+
+def random_states_to_arrays() -> Dict[str, np.ndarray]:
+    """
+    captures the state of Python's and NumPy's global random number generators as arrays, so that a resumed run draws
+    exactly the same random numbers as the original one would have.
+    :return: the named arrays describing both generators.
+    """
+    version, internal_state, gauss_next = random.getstate()
+    numpy_name, numpy_keys, numpy_pos, numpy_has_gauss, numpy_cached_gaussian = np.random.get_state()
+    return {"python_rng_version": np.array(version),
+            "python_rng_state": np.array(internal_state, dtype=np.uint32),
+            "python_rng_gauss_next": np.array(math.nan if gauss_next is None else gauss_next),
+            "numpy_rng_name": np.array(numpy_name),
+            "numpy_rng_keys": numpy_keys,
+            "numpy_rng_position": np.array(numpy_pos),
+            "numpy_rng_has_gauss": np.array(numpy_has_gauss),
+            "numpy_rng_cached_gaussian": np.array(numpy_cached_gaussian)}
+
+
+def restore_random_states(arrays: Dict[str, np.ndarray]):
+    """
+    puts Python's and NumPy's global random number generators back into the state captured by
+    random_states_to_arrays().
+    :param arrays: the arrays read from a checkpoint
+    """
+    gauss_next = float(arrays["python_rng_gauss_next"])
+    random.setstate((int(arrays["python_rng_version"]),
+                     tuple(int(value) for value in arrays["python_rng_state"]),
+                     None if math.isnan(gauss_next) else gauss_next))
+    np.random.set_state((str(arrays["numpy_rng_name"]),
+                         arrays["numpy_rng_keys"],
+                         int(arrays["numpy_rng_position"]),
+                         int(arrays["numpy_rng_has_gauss"]),
+                         float(arrays["numpy_rng_cached_gaussian"])))
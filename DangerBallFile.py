@@ -5,13 +5,17 @@ from typing import Optional, List
 import cv2
 import numpy as np
 
+from WorldConfigFile import WorldConfig, DEFAULT_WORLD
+
 DANGERBALL_RADIUS = 10
 
 class DangerBall:
 
-    def __init__(self, pos:Optional[List[int]] = None, vel: Optional[List[float]] = None):
+    def __init__(self, pos:Optional[List[int]] = None, vel: Optional[List[float]] = None,
+                 world: WorldConfig = DEFAULT_WORLD):
+        self.world = world
         if pos is None:
-            self.pos = [random.randint(0, 800), random.randint(0, 800)]
+            self.pos = world.random_position()
         else:
             self.pos = pos
         if vel is None:
@@ -27,18 +31,19 @@ class DangerBall:
         self.pos[0] += self.velocity[0] * delta_t
         self.pos[1] += self.velocity[1] * delta_t
 
+        bounds = (self.world.width, self.world.height)
         for i in range(2):
             if self.pos[i] < 0:
                 self.pos[i] *= -1
                 self.velocity[i] = abs(self.velocity[i])
 
-            if self.pos[i] > 800:
-                self.pos[i] = 1600 - self.pos[i]
+            if self.pos[i] > bounds[i]:
+                self.pos[i] = 2 * bounds[i] - self.pos[i]
                 self.velocity[i] = - abs(self.velocity[i])
 
     def draw_self(self, canvas: np.ndarray):
         cv2.circle(img=canvas,
-                   center=(int(self.pos[0]),int(self.pos[1])),
-                   radius= DANGERBALL_RADIUS,
+                   center=self.world.to_screen(self.pos),
+                   radius= self.world.scale_length(DANGERBALL_RADIUS),
                    color=(0, 0, 0),
                    thickness=1)
@@ -1,11 +1,16 @@
 import copy
+import functools
 import math
 import random
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Sequence
 
 import cv2
 import numpy as np
 
+from BrainFile import BrainArchitecture
+from LineageFile import NO_PARENT
+from WorldConfigFile import WorldConfig, DEFAULT_WORLD
+
 MAX_SPEED = 30
 MAX_TURN_RATIO = 0.2
 FEEDER_RADIUS = 5
@@ -15,92 +20,154 @@ DANGER_SENSOR_RADIUS = 100
 DANGER_SENSOR_RADIUS_SQUARED = math.pow(DANGER_SENSOR_RADIUS, 2)
 NUM_SENSORS = 16
 CONSUMPTION_PER_SECOND = 4
+DEFAULT_ARCHITECTURE = BrainArchitecture(num_inputs=2 * NUM_SENSORS)  # the original 32 -> 2 linear brain, 64 genes.
 
 VOWELS = ["a","e","i","o","u","y"]
 CONSONANTS = ["b","c","d","f","g","h","j","k","l","m","n","p","q","r","s","t","v","w","x","z"]
+NAME_LENGTH = 7
 """================================================================================================================
-    Three methods for creating and altering names. Names in this program are of the format:
+    Methods for creating and altering names. Names in this program are of the format:
     consonant, vowel, consonant, vowel, consonant, vowel, consonant.
+    Feeders store their names as small integer codes: each letter is a digit, base 20 for consonants and base 6 for
+    vowels, so a name costs one int, and is only spelled out (by decode_name) when it is displayed or saved.
 """
 
 
-def pick_name() -> str:
+def letters_at(index: int) -> List[str]:
     """
-    generates a random name
-    :return: the name selected
+    :param index: a position in a name, 0 to NAME_LENGTH - 1
+    :return: the letters that may appear there: consonants at even positions, vowels at odd ones.
     """
-    return (f"{random.choice(CONSONANTS).upper()}{random.choice(VOWELS)}{random.choice(CONSONANTS)}"
-            f"{random.choice(VOWELS)}{random.choice(CONSONANTS)}{random.choice(VOWELS)}{random.choice(CONSONANTS)}")
+    return CONSONANTS if index % 2 == 0 else VOWELS
 
 
-def mutate_name(name:str) -> str:
+def name_digits(code: int) -> List[int]:
     """
-    picks a new name that is one character different from the given name
-    :param name: a source name, 7 characters long
-    :return: a slightly different name, 7 characters long.
+    splits a name code into the indices of its letters.
+    :param code: a name code
+    :return: NAME_LENGTH indices into letters_at(0), letters_at(1), ...
     """
-    index = random.randint(0,6)
-
-    if index == 0:
-        new_name = random.choice(CONSONANTS).upper()
-    else:
-        new_name = name[0]
-
-    for i in range(1,7):
-        if index == i:
-            if index%2==0:
-                new_name += random.choice(CONSONANTS)
-            else:
-                new_name += random.choice(VOWELS)
-        else:
-            new_name += name[i]
+    digits = [0] * NAME_LENGTH
+    for i in range(NAME_LENGTH - 1, -1, -1):
+        code, digits[i] = divmod(code, len(letters_at(i)))
+    return digits
+
+
+def code_from_digits(digits: Sequence[int]) -> int:
+    """
+    combines the indices of the letters of a name into a name code.
+    :param digits: NAME_LENGTH indices into letters_at(0), letters_at(1), ...
+    :return: the name code
+    """
+    code = 0
+    for i in range(NAME_LENGTH):
+        code = code * len(letters_at(i)) + digits[i]
+    return code
 
-    return new_name
+
+def encode_name(name: str) -> int:
+    """
+    :param name: a 7-character name, e.g., "Dejupev"
+    :return: its name code
+    """
+    if len(name) != NAME_LENGTH:
+        raise ValueError(f"Names have {NAME_LENGTH} letters, but '{name}' has {len(name)}.")
+    try:
+        return code_from_digits([letters_at(i).index(letter) for i, letter in enumerate(name.lower())])
+    except ValueError:
+        raise ValueError(f"'{name}' does not alternate consonants and vowels.") from None
+
+
+@functools.lru_cache(maxsize=4096)
+def decode_name(code: int) -> str:
+    """
+    :param code: a name code
+    :return: the 7-character name it stands for, capitalized.
+    """
+    return "".join(letters_at(i)[digit] for i, digit in enumerate(name_digits(code))).capitalize()
 
 
-def baby_name(name1:str, name2:str) -> str:
+def pick_name() -> int:
+    """
+    generates a random name
+    :return: the code of the name selected
+    """
+    return code_from_digits([random.randrange(len(letters_at(i))) for i in range(NAME_LENGTH)])
+
+
+def mutate_name(code: int) -> int:
+    """
+    picks a new name that is one letter different from the given name
+    :param code: the code of a source name
+    :return: the code of a slightly different name.
+    """
+    index = random.randint(0, NAME_LENGTH - 1)
+    digits = name_digits(code)
+    digits[index] = random.randrange(len(letters_at(index)))
+    return code_from_digits(digits)
+
+
+def baby_name(code1: int, code2: int) -> int:
     """
     picks a new name, randomly composed of the letters in the parents' names
-    :param name1: a 7-character string
-    :param name2: another 7-character string
-    :return: a new 7-character string.
+    :param code1: the code of one parent's name
+    :param code2: the code of the other parent's name
+    :return: the code of the new name.
     """
-    baby_name = ""
-    for i in range(7):
-        if random.random() > 0.5:
-            baby_name += name1[i]
-        else:
-            baby_name += name2[i]
-    return baby_name
+    digits1 = name_digits(code1)
+    digits2 = name_digits(code2)
+    return code_from_digits([digits1[i] if random.random() > 0.5 else digits2[i] for i in range(NAME_LENGTH)])
 
 """
 ==================================================================================================== FEEDER CLASS
 """
 class Feeder:
-
-    def __init__(self, genes: Optional[List[float]] = None):
-        self.position: List[float] = [random.randint(0, 800), random.randint(0, 800)]
+    # a feeder has exactly these attributes, so it needs no per-instance __dict__.
+    __slots__ = ("world", "architecture", "position", "orientation", "speed", "turn_ratio", "food_sensors",
+                 "danger_sensors", "color", "genes", "is_alive", "food_level", "age", "death_reason", "name_code",
+                 "lineage_id", "parent_ids")
+
+    def __init__(self, genes: Optional[List[float]] = None, world: WorldConfig = DEFAULT_WORLD,
+                 architecture: BrainArchitecture = DEFAULT_ARCHITECTURE):
+        self.world = world
+        self.architecture = architecture
+        self.position: List[float] = world.random_position()
         self.orientation = random.random()*2*math.pi-math.pi
         self.speed = 15.0
         self.turn_ratio = 0.0  # a.k.a. angular velocity
 
-        self.food_sensors = [0.0 for i in range(NUM_SENSORS)]   # detection levels of food and danger in various angles,
-        self.danger_sensors = [0.0 for i in range(NUM_SENSORS)]  # ranging from -π to +π, relative to the orientation.
+        self.food_sensors = np.zeros(NUM_SENSORS)   # detection levels of food and danger in various angles,
+        self.danger_sensors = np.zeros(NUM_SENSORS)  # ranging from -π to +π, relative to the orientation.
 
         self.color: Tuple[float, float, float] = (random.random() * 0.8, random.random() * 0.8 , random.random() * 0.8)
 
-        # randomize genes or load them from "genes"
+        # randomize genes or load them from "genes". They are kept as a read-only array of floats (which a BrainEngine
+        # may later swap for a view of its gene matrix).
         if genes is None:
-            self.genes = tuple([2*random.random()-1 for i in range(4*NUM_SENSORS)])
+            self.genes = np.array([2*random.random()-1 for i in range(architecture.gene_length)])
         else:
-            self.genes = tuple(genes)
+            if len(genes) != architecture.gene_length:
+                raise ValueError(f"A {architecture.describe()} brain needs {architecture.gene_length} genes, "
+                                 f"not {len(genes)}.")
+            self.genes = np.array(genes, dtype=float)
+        self.genes.flags.writeable = False
 
         self.is_alive = True
         self.food_level = 50
         self.age = 0.0
         self.death_reason = ""
-        self.name = pick_name()
+        self.name_code = pick_name()
+        # this feeder's id in the run's lineage store, once it has been recorded there, and its parents' ids.
+        self.lineage_id = NO_PARENT
+        self.parent_ids: Tuple[int, int] = (NO_PARENT, NO_PARENT)
+
+    @property
+    def name(self) -> str:
+        return decode_name(self.name_code)
 
+    @name.setter
+    def name(self, name: str):
+        self.name_code = encode_name(name)
 
     def die(self, reason=""):
         """
@@ -115,7 +182,7 @@ class Feeder:
         reactivate this feeder for the next generation.
         """
         self.is_alive = True
-        self.position = [random.randint(0, 800), random.randint(0, 800)]
+        self.position = self.world.random_position()
         self.orientation = random.random() * 2 * math.pi - math.pi
         self.death_reason = ""
         self.food_level = 50
@@ -129,53 +196,61 @@ class Feeder:
         :param canvas: the window in which to draw
         :param display_sensors: whether to draw the lines representing when this feeder is sensing something.
         """
+        center = self.world.to_screen(self.position)
         if display_sensors:
+            danger_length = DANGER_SENSOR_RADIUS * self.world.zoom
+            food_length = FOOD_SENSOR_RADIUS * self.world.zoom
             for i in range(NUM_SENSORS):
                 angle = (i * math.pi * 2 / NUM_SENSORS + self.orientation) % (2*math.pi) - math.pi
                 if self.danger_sensors[i]>0:
-                    cv2.line(img=canvas, pt1=(int(self.position[0]), int(self.position[1])),
-                             pt2=(int(self.position[0] + DANGER_SENSOR_RADIUS * math.cos(angle)),
-                                  int(self.position[1] + DANGER_SENSOR_RADIUS * math.sin(angle))),
+                    cv2.line(img=canvas, pt1=center,
+                             pt2=(int(center[0] + danger_length * math.cos(angle)),
+                                  int(center[1] + danger_length * math.sin(angle))),
                              color=(0, 0.5 +self.danger_sensors[i]/2, 0),
                              thickness=1)
                 if self.food_sensors[i]>0:
-                    cv2.line(img=canvas, pt1=(int(self.position[0]), int(self.position[1])),
-                             pt2=(int(self.position[0] + FOOD_SENSOR_RADIUS * math.cos(angle)),
-                                  int(self.position[1] + FOOD_SENSOR_RADIUS * math.sin(angle))),
+                    cv2.line(img=canvas, pt1=center,
+                             pt2=(int(center[0] + food_length * math.cos(angle)),
+                                  int(center[1] + food_length * math.sin(angle))),
                              color=(0.0, 0.0, self.food_sensors[i]),
                              thickness=1)
 
-        cv2.circle(img=canvas, center=(int(self.position[0]), int(self.position[1])), radius=FEEDER_RADIUS, color=self.color,
+        radius = self.world.scale_length(FEEDER_RADIUS)
+        cv2.circle(img=canvas, center=center, radius=radius, color=self.color,
                    thickness=-1)
-        front = (int(self.position[0]+FEEDER_RADIUS*math.cos(self.orientation)),
-                 int(self.position[1]+FEEDER_RADIUS*math.sin(self.orientation)))
-        cv2.line(img=canvas,pt1=(int(self.position[0]), int(self.position[1])),
+        front = (int(center[0]+radius*math.cos(self.orientation)),
+                 int(center[1]+radius*math.sin(self.orientation)))
+        cv2.line(img=canvas,pt1=center,
                  pt2=front,
                  color=(1.0, 1.0, 1.0),
                  thickness=3)
 
-        cv2.line(img=canvas, pt1=(int(self.position[0]), int(self.position[1])),
+        cv2.line(img=canvas, pt1=center,
                  pt2=front,
                  color=(0.0, 0.0, 0.0),
                  thickness=1)
-        cv2.putText(img=canvas, text=f"{self.name}",org=(int(self.position[0]-20),int(self.position[1]-15)),fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=0.75, color=self.color)
+        cv2.putText(img=canvas, text=f"{self.name}",org=(center[0]-20,center[1]-15),fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=0.75, color=self.color)
         health_color = (0,1,0)
         if self.food_level < 20:
             health_color = (0,0,1)
-        cv2.line(img=canvas, pt1=(int(self.position[0]-20),int(self.position[1]-14)),
-                 pt2=(int(self.position[0]-20+0.3*self.food_level),int(self.position[1]-14)),
+        cv2.line(img=canvas, pt1=(center[0]-20,center[1]-14),
+                 pt2=(int(center[0]-20+0.3*self.food_level),center[1]-14),
                  color=health_color, thickness = 2)
 
     def clear_sensors(self):
         """
-        reset the values of the sensors to zero, in preparation to start sensing again for this animation step.
+        reset the values of the sensors to zero, in preparation to start sensing again for this animation step. The
+        sensors are cleared in place, since they may be views into a BrainEngine's sensor array.
         """
-        self.food_sensors = [0.0 for _ in range(NUM_SENSORS)]
-        self.danger_sensors = [0.0 for _ in range(NUM_SENSORS)]
+        self.food_sensors[:] = 0.0
+        self.danger_sensors[:] = 0.0
 
     def detect(self, loc: Tuple[float, float] | List[float], isDanger=False):
         """
         update the sensors for this feeder, based on a piece of food or a danger at the given location.
+        The simulation doesn't call this: GeneticAlgorithmRunner.detect_all_food_and_dangers() senses for all the
+        feeders at once. This is the reference that the batched sensing must agree with, and it is checked against
+        it by check_sensing() in StepFidelityCheck.
         :param loc: the location of the food or danger
         :param isDanger: whether this is a danger object or a food object.
         """
@@ -200,10 +275,12 @@ class Feeder:
             self.food_sensors[index] = max(self.food_sensors[index],proximity)
         # print(f"{self.danger_sensors=}\t{self.food_sensors=}")
 
-    def animation_step(self, delta_t: float):
+    def animation_step(self, delta_t: float, motion_command: Optional[Sequence[float]] = None):
         """
         simulate one step of the feeder's life.
         :param delta_t: the time since the previous animation step
+        :param motion_command: the [change in speed, change in turn ratio] already computed for this feeder by a
+        BrainEngine, or None to evaluate this feeder's brain here.
         """
         self.food_level -= CONSUMPTION_PER_SECOND*delta_t
         if self.food_level < 0:
@@ -213,7 +290,7 @@ class Feeder:
 
         self.age += delta_t
 
-        self.update_feeder_motion_from_sensors()
+        self.update_feeder_motion_from_sensors(motion_command)
 
         #  note: moves in the direction halfway between previous orientation and new orientation.
         self.orientation += self.turn_ratio*delta_t/2
@@ -222,17 +299,18 @@ class Feeder:
         self.orientation += self.turn_ratio * delta_t / 2
 
 
-    def update_feeder_motion_from_sensors(self):
+    def update_feeder_motion_from_sensors(self, motion_command: Optional[Sequence[float]] = None):
         """
         translates the values of the sensors to commands for the speed and turn ratio, based on the genes for this
-        feeder. This is where the genes of the feeder have their effect; each one is multiplied by the corresponding
-        sensor, and the totals are sent to the speed and turn_direction controls, both of which are capped.
+        feeder. This is where the genes of the feeder have their effect; the sensors are fed through the brain that the
+        genes describe, and its two outputs are sent to the speed and turn_direction controls, both of which are capped.
+        :param motion_command: the brain's outputs, if a BrainEngine has already computed them for the whole population.
         """
-        for i in range(NUM_SENSORS):
-            self.speed += (self.genes[i] * self.food_sensors[i] +
-                           self.genes[i + NUM_SENSORS] * self.danger_sensors[i])
-            self.turn_ratio += (self.genes[i + NUM_SENSORS * 2] * self.food_sensors[i] +
-                                self.genes[i + NUM_SENSORS * 3] * self.danger_sensors[i])
+        if motion_command is None:
+            sensors = np.concatenate((self.food_sensors, self.danger_sensors)).reshape(1, -1)
+            motion_command = self.architecture.evaluate(self.genes.reshape(1, -1), sensors)[0]
+        self.speed += float(motion_command[0])
+        self.turn_ratio += float(motion_command[1])
         self.speed = min(MAX_SPEED, max(-MAX_SPEED, self.speed))
         self.turn_ratio = min(MAX_TURN_RATIO, max(-MAX_TURN_RATIO, self.turn_ratio))
 
@@ -264,11 +342,14 @@ class Feeder:
         :return:
         """
         angle_per_sensor = 360/NUM_SENSORS;
+        # for brains with hidden layers, we draw the layers multiplied together; for the original brain, these are
+        # just the genes.
+        weights = self.architecture.effective_weights(self.genes).tolist()
         for i in range(NUM_SENSORS):
-            color_food_speed = (0, max(0, self.genes[i]), max(0, -self.genes[i]))
-            color_danger_speed = (0, max(0, self.genes[i+NUM_SENSORS]), max(0, -self.genes[i+NUM_SENSORS]))
-            color_food_turn = (0, max(0, self.genes[i+2*NUM_SENSORS]), max(0, -self.genes[i+2*NUM_SENSORS]))
-            color_danger_turn = (0, max(0, self.genes[i + 3* NUM_SENSORS]), max(0, -self.genes[i + 3 * NUM_SENSORS]))
+            color_food_speed = (0, max(0, weights[0][i]), max(0, -weights[0][i]))
+            color_danger_speed = (0, max(0, weights[0][i+NUM_SENSORS]), max(0, -weights[0][i+NUM_SENSORS]))
+            color_food_turn = (0, max(0, weights[1][i]), max(0, -weights[1][i]))
+            color_danger_turn = (0, max(0, weights[1][i + NUM_SENSORS]), max(0, -weights[1][i + NUM_SENSORS]))
 
             cv2.ellipse(img=canvas,
                         center=center,
@@ -348,14 +429,15 @@ class Feeder:
         :param other: the mate to self
         :return: the baby feeder created by these two parents, self and other.
         """
-        parent_1_genes = self.genes  # a list of 4 * NUM_SENSORS floats
-        parent_2_genes = other.genes # another list of 4 * NUM_SENSORS floats.
+        parent_1_genes = self.genes  # an array of self.architecture.gene_length floats
+        parent_2_genes = other.genes # another array of self.architecture.gene_length floats.
 
-        # make baby_genes become a new list of 4 * NUM_SENSORS floats.
+        # make baby_genes become a new list of self.architecture.gene_length floats.
         baby_genes = copy.deepcopy(parent_1_genes) # TODO: This is wrong. Do something sexier.
 
-        baby = Feeder(genes=baby_genes)
-        baby.name = baby_name(self.name, other.name)
+        baby = Feeder(genes=baby_genes, world=self.world, architecture=self.architecture)
+        baby.name_code = baby_name(self.name_code, other.name_code)
+        baby.parent_ids = (self.lineage_id, other.lineage_id)
         return baby
 
     def get_mutated_version_of_Feeder(self) -> "Feeder":
@@ -367,9 +449,10 @@ class Feeder:
 
         :return: a new Feeder, a mutated version of self.
         """
-        new_gene_set = list(copy.deepcopy(self.genes))
+        new_gene_set = self.genes.tolist()
 
         # TODO: use random to potentially make one or more changes to these genes.
-        new_Feeder = Feeder(new_gene_set)
-        new_Feeder.name = mutate_name(self.name)
+        new_Feeder = Feeder(new_gene_set, world=self.world, architecture=self.architecture)
+        new_Feeder.name_code = mutate_name(self.name_code)
+        new_Feeder.parent_ids = (self.lineage_id, NO_PARENT)
         return new_Feeder
\ No newline at end of file
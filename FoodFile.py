@@ -1,15 +1,22 @@
 import random
+from typing import Optional, Tuple
 
 import cv2
 import numpy as np
 
+from WorldConfigFile import WorldConfig, DEFAULT_WORLD
+
 FOOD_RADIUS = 4
 
 class Food:
 
-    def __init__(self):
-        self.pos = (random.randint(FOOD_RADIUS,800-FOOD_RADIUS),
-                    random.randint(FOOD_RADIUS,800-FOOD_RADIUS))
+    def __init__(self, world: WorldConfig = DEFAULT_WORLD, pos: Optional[Tuple[int, int]] = None):
+        self.world = world
+        if pos is None:
+            self.pos = tuple(world.random_position(margin=FOOD_RADIUS))
+        else:
+            self.pos = pos
 
     def draw_self(self, canvas:np.ndarray):
-        cv2.circle(img=canvas, center=self.pos, radius = FOOD_RADIUS, color=(0,0.5,0.25), thickness = -1)
+        cv2.circle(img=canvas, center=self.world.to_screen(self.pos), radius = self.world.scale_length(FOOD_RADIUS),
+                   color=(0,0.5,0.25), thickness = -1)
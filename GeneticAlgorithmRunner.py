@@ -1,44 +1,90 @@
+import argparse
 import math
+import os
 import random
 from datetime import datetime
-from typing import List, Set
+from typing import Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
+from AdaptiveSteppingFile import CoastSchedule, safe_coast_steps, fastest_danger_speed
+from BrainFile import BrainArchitecture, BrainEngine, ACTIVATIONS
+from CheckpointFile import (CHECKPOINT_SUFFIX, write_checkpoint, read_checkpoint, random_states_to_arrays,
+                            restore_random_states)
 from DangerBallFile import DangerBall, DANGERBALL_RADIUS
-from FeederFile import Feeder, FEEDER_RADIUS
+from FeederFile import (Feeder, FEEDER_RADIUS, DEFAULT_ARCHITECTURE, NUM_SENSORS, FOOD_SENSOR_RADIUS,
+                        FOOD_SENSOR_RADIUS_SQUARED, DANGER_SENSOR_RADIUS, DANGER_SENSOR_RADIUS_SQUARED)
 from FoodFile import Food, FOOD_RADIUS
+from HallOfFameFile import HallOfFame, HALL_OF_FAME_SUFFIX
+from LeaderboardFile import Leaderboard
+from LineageFile import LineageStore, LINEAGE_SUFFIX, NO_PARENT
+from ProximityFile import ProximityCache
+from SpriteRendererFile import SpriteRenderer
+from TelemetryFile import PhaseTimer, TelemetryServer
+from WorldConfigFile import WorldConfig, DEFAULT_WORLD, DEFAULT_VIEWPORT_SIZE
 
 
 
 DISPLAY_SENSORS = False  # whether to show the radial sensor lines from the feeders
 GRAPHIC_SIMULATION = True  # whether to show the simulation, or do a 10x faster simulation without the animation.
 DISPLAY_GRAPH = False  # whether to show a graph of the best and average scores per generation, starting after gen 1
+USE_SPRITE_RENDERER = True  # whether to draw the simulation by stamping pre-drawn sprites, rather than one by one.
+DISPLAY_FEEDER_LABELS = True  # whether to show each feeder's name and health bar; slow with many feeders.
 
 MAX_CYCLE_DURATION = 60  # the number of seconds before we give up on this generation and kill any feeders left
+FIXED_TIME_STEP: Optional[float] = None  # if set, the simulated seconds per animation step, instead of the wall clock.
+                                         # A run resumed from a checkpoint repeats the original exactly only if set.
+ADAPTIVE_STEPPING = False  # whether feeders far from food and dangers skip animation steps (only in undrawn steps of a
+                           # fixed length, e.g., with FIXED_TIME_STEP or in run_headless()).
+CHECKPOINT_INTERVAL = 120  # the number of (real) seconds between automatic checkpoints of the whole run; None for none.
 FOOD_THRESHOLD_SQUARED = math.pow(FOOD_RADIUS + FEEDER_RADIUS, 2)
 DANGER_THRESHOLD_SQUARED = math.pow(DANGERBALL_RADIUS + FEEDER_RADIUS, 2)
-NUM_FEEDERS = 81
-NUM_MOVING_DANGERS = 30
-NUM_FOOD = 200
+TELEMETRY_PORT: Optional[int] = None  # the local port on which to serve live status and take commands; None for none.
+TELEMETRY_TOP_GENOMES = 5  # how many of the best feeders of the last generation to report, genes and all.
+HALL_OF_FAME_PER_GENERATION = 5  # how many of the best feeders of each generation to archive in the hall of fame.
+RECORD_LINEAGE = True  # whether to record every feeder's parents and scores in an on-disk lineage store.
+MAX_DISPLAYED_FEEDERS = 81  # the stats window shows the genes of (at most) this many of the top-ranked feeders.
+
+BRAIN_HEADER = "#brain "  # starts the optional line in a generation file that describes the brain architecture.
 
 GRAPH_SIZE = 400  # size of the graph window
 GRAPH_MARGIN = 20  # number of pixels on all sides of the graph in the graph window.
 
 class GeneticAlgorithmRunner:
 
-    def __init__(self):
+    def __init__(self, world: WorldConfig = DEFAULT_WORLD, architecture: BrainArchitecture = DEFAULT_ARCHITECTURE,
+                 show_windows: bool = True):
+        """
+        :param world: the size of the arena and the number of feeders, food and dangers in it
+        :param architecture: the shape of the feeders' brains
+        :param show_windows: whether to open any OpenCV windows; False for runs on machines without a display, which
+        must be driven by run_headless() rather than animation_loop().
+        """
+        self.world = world
+        self.show_windows = show_windows
+        self.architecture = architecture
+        self.brain_engine = BrainEngine(architecture)
+        # the distances from feeders to food and dangers, remembered from one interaction check to the next.
+        self.food_proximity = ProximityCache(FOOD_SENSOR_RADIUS_SQUARED)
+        self.danger_proximity = ProximityCache(DANGER_SENSOR_RADIUS_SQUARED)
+        self.hall_of_fame = HallOfFame(architecture.gene_length)
+        self.coast_schedule = CoastSchedule()  # which feeders are skipping steps, under ADAPTIVE_STEPPING.
+        self.lineage: Optional[LineageStore] = None  # opened when the first generation is recorded.
         self.program_run_number = random.randint(1000, 9999)  # a random 4-digit id for this run.
-        self.main_canvas = np.ones((800, 800, 3), dtype=float)
+        screen_width, screen_height = self.world.screen_size()
+        self.main_canvas = np.ones((screen_height, screen_width, 3), dtype=float)
+        self.sprite_renderer = SpriteRenderer(self.world)
         self.stats_canvas = np.ones((600, 600, 3), dtype=float)
-        cv2.imshow("stats", self.stats_canvas)
-        cv2.moveWindow("stats", 800, 100)
+        if self.show_windows:
+            cv2.imshow("stats", self.stats_canvas)
+            cv2.moveWindow("stats", screen_width, 100)
 
         self.moving_danger_list: List[DangerBall] = []
         self.all_dangers: List[DangerBall] = []
         self.food_list: List[Food] = []
         self.feeder_list: List[Feeder] = []
+        self.leaderboard = Leaderboard()
 
         self.reset_feeder_list()
         self.create_dangers_and_food()
@@ -47,7 +93,19 @@ class GeneticAlgorithmRunner:
         self.age_of_cycle = 0.0
         self.generation_number = 0
         self.should_save_this_generation = False
-        self.live_feeders = NUM_FEEDERS
+        self.live_feeders = self.world.num_feeders
+        self.save_filename = f"generation {self.program_run_number}"
+        self.last_checkpoint_time = datetime.now()
+
+        self.phase_timer = PhaseTimer()
+        self.stop_after_generation = False
+        self.telemetry: Optional[TelemetryServer] = None
+        if TELEMETRY_PORT is not None:
+            try:
+                self.telemetry = TelemetryServer(TELEMETRY_PORT)
+                print(f"Serving telemetry at http://{self.telemetry.host}:{self.telemetry.port}/")
+            except Exception as e:
+                print(f"An error occurred while starting the telemetry server: {e}")
 
         #  stuff for statistics
         self.best_score_per_generation: List[float] = []
@@ -57,13 +115,22 @@ class GeneticAlgorithmRunner:
         self.create_moving_dangers()
         self.create_danger_walls()
         self.create_food()
+        self.forget_proximities()
+
+    def forget_proximities(self):
+        """
+        empties the proximity caches. They know the feeders by their places in the population and the food and dangers
+        by their places in their lists, so they must start afresh whenever the population or those lists are rebuilt.
+        """
+        self.food_proximity.clear()
+        self.danger_proximity.clear()
 
     def create_moving_dangers(self):
         """
         creates the circles that move around the canvas, deadly to the feeders.
         """
-        for i in range(NUM_MOVING_DANGERS):
-            db = DangerBall()
+        for i in range(self.world.num_moving_dangers):
+            db = DangerBall(world=self.world)
             self.moving_danger_list.append(db)
             self.all_dangers.append(db)
 
@@ -72,41 +139,64 @@ class GeneticAlgorithmRunner:
         creates the circles that represent the border of the canvas. These are just outside the visible canvas and do
         not move. They, too, are deadly to the feeders.
         """
-        for i in range(int(800 / DANGERBALL_RADIUS / 2 + 1)):
+        for i in range(int(self.world.width / DANGERBALL_RADIUS / 2 + 1)):
             self.all_dangers.append(
                 DangerBall(pos=[int(-DANGERBALL_RADIUS / 2 + i * DANGERBALL_RADIUS * 2), int(-DANGERBALL_RADIUS / 2)],
-                           vel=[0, 0]))
+                           vel=[0, 0], world=self.world))
+            self.all_dangers.append(DangerBall(
+                pos=[int(-DANGERBALL_RADIUS / 2 + i * DANGERBALL_RADIUS * 2),
+                     int(self.world.height + DANGERBALL_RADIUS / 2)],
+                vel=[0, 0], world=self.world))
+        for i in range(int(self.world.height / DANGERBALL_RADIUS / 2 + 1)):
             self.all_dangers.append(
                 DangerBall(pos=[int(-DANGERBALL_RADIUS / 2), int(-DANGERBALL_RADIUS / 2 + i * DANGERBALL_RADIUS * 2)],
-                           vel=[0, 0]))
+                           vel=[0, 0], world=self.world))
             self.all_dangers.append(DangerBall(
-                pos=[int(-DANGERBALL_RADIUS / 2 + i * DANGERBALL_RADIUS * 2), int(800 + DANGERBALL_RADIUS / 2)],
-                vel=[0, 0]))
-            self.all_dangers.append(DangerBall(
-                pos=[int(800 + DANGERBALL_RADIUS / 2), int(-DANGERBALL_RADIUS / 2 + i * DANGERBALL_RADIUS * 2)],
-                vel=[0, 0]))
+                pos=[int(self.world.width + DANGERBALL_RADIUS / 2),
+                     int(-DANGERBALL_RADIUS / 2 + i * DANGERBALL_RADIUS * 2)],
+                vel=[0, 0], world=self.world))
 
     def create_food(self):
         """
         creates a random selection of food items on the canvas, the green solid dots.
         """
-        for i in range(NUM_FOOD):
-            self.food_list.append(Food())
+        for i in range(self.world.num_food):
+            self.food_list.append(Food(world=self.world))
+
+    def use_scenario(self, danger_positions: np.ndarray, danger_velocities: np.ndarray, food_positions: np.ndarray):
+        """
+        replaces the moving dangers and the food with a prepared layout, e.g., one shared by all the runs of a sweep so
+        that they face the same world. The walls stay as they are.
+        :param danger_positions: an (N x 2) array of the starting locations of the moving dangers
+        :param danger_velocities: an (N x 2) array of their velocities
+        :param food_positions: an (M x 2) array of the locations of the food
+        """
+        walls = self.all_dangers[len(self.moving_danger_list):]
+        self.moving_danger_list = [DangerBall(pos=pos, vel=vel, world=self.world)
+                                   for pos, vel in zip(danger_positions.tolist(), danger_velocities.tolist())]
+        self.all_dangers = self.moving_danger_list + walls
+        self.food_list = [Food(world=self.world, pos=tuple(pos)) for pos in food_positions.tolist()]
+        self.forget_proximities()
 
     def reset_feeder_list(self, all_weights:List[List[float]] = None, names:List[str] = None):
         """
         generates a new set of feeders. If all_weights is None, then they are generated randomly. Otherwise, they
-        are generated based on the weights in all_weights, and use the names given
+        are generated based on the weights in all_weights (one feeder per weight list), and use the names given
         :param all_weights: a List of weight lists to populate the feeders.
         :param names: the names that should be given to the feeders.
         """
         self.feeder_list.clear()
-        for i in range(NUM_FEEDERS):
-            if all_weights is None:
-                self.feeder_list.append(Feeder())
-            else:
-                self.feeder_list.append(Feeder(genes=all_weights[i]))
+        if all_weights is None:
+            for i in range(self.world.num_feeders):
+                self.feeder_list.append(Feeder(world=self.world, architecture=self.architecture))
+        else:
+            for i in range(len(all_weights)):
+                self.feeder_list.append(Feeder(genes=all_weights[i], world=self.world, architecture=self.architecture))
                 self.feeder_list[i].name = names[i]
+        self.brain_engine.attach(self.feeder_list)
+        self.coast_schedule.reset(len(self.feeder_list))
+        self.leaderboard.reset(self.feeder_list)
+        self.forget_proximities()
         self.cycle_ongoing = True
         self.age_of_cycle = 0.0
         self.should_save_this_generation = False
@@ -114,18 +204,21 @@ class GeneticAlgorithmRunner:
 
     def display_feeders(self, canvas: np.ndarray):
         """
-        Tells all the feeders to draw their attributes in the stats window, in a grid.
+        Tells the top-ranked feeders (at most MAX_DISPLAYED_FEEDERS of them) to draw their attributes in the stats
+        window, in a grid. The last row of the grid may be partly empty.
         :param canvas: the stats window in which to draw.
         """
         cv2.putText(img=canvas, text=f"Generation: {self.generation_number}", org=(10,10),
                     fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=1.0, color=(0, 0, 0))
-        num_rows = int(math.sqrt(len(self.feeder_list)))
-        num_cols = math.ceil(len(self.feeder_list)/num_rows)
+        displayed_feeders = self.leaderboard.top(MAX_DISPLAYED_FEEDERS)
+        num_displayed = len(displayed_feeders)
+        num_rows = max(1, int(math.sqrt(num_displayed)))
+        num_cols = math.ceil(num_displayed/num_rows)
         scale = 2.5/num_cols
         feeder_width = int(600/num_cols)
-        for i in range(num_rows):
-            for j in range(num_cols):
-                self.feeder_list[i * num_cols + j].display_attributes_at(canvas, (feeder_width * j + 60, (feeder_width+10) * i + 90), scale)
+        for k in range(num_displayed):
+            i, j = divmod(k, num_cols)
+            displayed_feeders[k].display_attributes_at(canvas, (feeder_width * j + 60, (feeder_width+10) * i + 90), scale)
 
     def animation_loop(self):
         """
@@ -134,26 +227,19 @@ class GeneticAlgorithmRunner:
         self.latest = datetime.now()
         while True:
             now = datetime.now()
-            delta_t = (now - self.latest).total_seconds()
-            if not GRAPHIC_SIMULATION:
-                delta_t *= 10
+            if FIXED_TIME_STEP is None:
+                delta_t = (now - self.latest).total_seconds()
+                if not GRAPHIC_SIMULATION:
+                    delta_t *= 10
+            else:
+                delta_t = FIXED_TIME_STEP
             self.age_of_cycle += delta_t
             self.latest = now
 
-            main_canvas = np.ones((800, 800, 3), dtype=float)
+            main_canvas = np.ones(self.main_canvas.shape, dtype=float)
 
-            self.clear_all_live_feeder_sensors()
-            self.move_and_draw_dangers(delta_t, main_canvas)
-            self.detect_all_dangers()
-            self.detect_all_food()
-            self.move_all_feeders(delta_t)
-            self.check_for_eaten_food()
-            self.check_for_feeder_danger_collisions()
-            if GRAPHIC_SIMULATION:
-                self.draw_all_food(main_canvas)
-            if self.cycle_ongoing and self.age_of_cycle >= MAX_CYCLE_DURATION:
-                self.kill_all_feeders()
-            self.count_live_feeders()
+            self.simulate_step(delta_t, main_canvas if GRAPHIC_SIMULATION else None)
+            self.obey_telemetry_commands()
             if GRAPHIC_SIMULATION:
                 self.update_stats_window()
 
@@ -161,8 +247,10 @@ class GeneticAlgorithmRunner:
                 self.draw_all_feeders(main_canvas)
                 cv2.imshow("Canvas", main_canvas)
                 response = cv2.waitKey(10)
-            else:
+            elif self.telemetry is None:
                 response = cv2.waitKey(1)
+            else:
+                response = -1  # without the animation, commands come through the telemetry server instead of keys.
             if response == 115 or response == 83: #  ascii for s or S -- for Save
                self.should_save_this_generation = True
 
@@ -171,7 +259,87 @@ class GeneticAlgorithmRunner:
 
             if not self.cycle_ongoing:
                 self.handle_end_of_generation()
+                if self.stop_after_generation:
+                    break
+
+            if CHECKPOINT_INTERVAL is not None and (now - self.last_checkpoint_time).total_seconds() >= CHECKPOINT_INTERVAL:
+                self.save_checkpoint(f"{self.save_filename}{CHECKPOINT_SUFFIX}")
+                self.last_checkpoint_time = now
+
+    def simulate_step(self, delta_t: float, main_canvas: Optional[np.ndarray] = None):
+        """
+        advances the world by one animation step: the dangers move, the feeders sense, move, eat and collide, and the
+        generation ends if time is up. The caller is responsible for adding delta_t to self.age_of_cycle first.
+
+        Under ADAPTIVE_STEPPING, feeders that sense nothing and can't come within sensing range of anything for a while
+        skip the steps until then (see AdaptiveSteppingFile), so they cost nothing; they are brought up to date when
+        they wake, before they are drawn and before the generation times out.
+        :param delta_t: the number of seconds since the last animation step
+        :param main_canvas: the canvas on which to draw the dangers and food, or None to draw nothing.
+        """
+        timer = self.phase_timer
+        timer.start_step()
+        schedule = self.coast_schedule
+        population = self.brain_engine.feeders
+        schedule.step += 1
+        if delta_t != schedule.delta_t:
+            self.record_deaths(schedule.settle_all(population, schedule.step - 1))
+        self.record_deaths(schedule.settle(population, schedule.due(), schedule.step - 1))
+        timer.lap("waking")
+
+        self.clear_all_live_feeder_sensors()
+        self.move_and_draw_dangers(delta_t, main_canvas)
+        timer.lap("dangers")
+        self.detect_all_food_and_dangers()
+        timer.lap("sensing")
+        self.move_all_feeders(delta_t, allow_coasting=ADAPTIVE_STEPPING and main_canvas is None)
+        timer.lap("moving")
+        self.check_for_eaten_food_and_collisions()
+        timer.lap("eating and collisions")
+        if main_canvas is not None:
+            self.record_deaths(schedule.settle_all(population, schedule.step))
+            self.draw_all_food(main_canvas)
+        if self.cycle_ongoing and self.age_of_cycle >= MAX_CYCLE_DURATION:
+            self.record_deaths(schedule.settle_all(population, schedule.step))
+            self.kill_all_feeders()
+        self.count_live_feeders()
+        timer.lap("drawing and timeout")
+        if timer.end_step() and self.telemetry is not None:
+            self.telemetry.publish(generation=self.generation_number, age_of_cycle=self.age_of_cycle,
+                                   live_feeders=self.live_feeders, steps_per_second=timer.steps_per_second,
+                                   phase_milliseconds=timer.phase_milliseconds)
+
+    def run_headless(self, num_generations: int, delta_t: float):
+        """
+        runs the simulation as fast as possible, without drawing or reading the keyboard, until num_generations more
+        generations have finished.
+        :param num_generations: how many generations to run
+        :param delta_t: the number of simulated seconds per animation step
+        """
+        last_generation = self.generation_number + num_generations
+        while self.generation_number < last_generation:
+            self.age_of_cycle += delta_t
+            self.simulate_step(delta_t)
+            self.obey_telemetry_commands()
+            if not self.cycle_ongoing:
+                self.handle_end_of_generation()
+                if self.stop_after_generation:
+                    break
 
+    def obey_telemetry_commands(self):
+        """
+        carries out any commands that have come in through the telemetry server: "save" writes a checkpoint right
+        away, and "stop" ends the run once the current generation is over.
+        """
+        if self.telemetry is None:
+            return
+        for command in self.telemetry.pending_commands():
+            if command == "save":
+                self.save_checkpoint(f"{self.save_filename}{CHECKPOINT_SUFFIX}")
+                self.last_checkpoint_time = datetime.now()
+            elif command == "stop":
+                self.stop_after_generation = True
+            self.telemetry.publish(stopping_after_generation=self.stop_after_generation)
 
 
     def draw_labels_in_simulation_window(self, main_canvas):
@@ -179,15 +347,17 @@ class GeneticAlgorithmRunner:
         draws the information in the four corners of the simulation canvas
         :param main_canvas: the canvas that displays the simulation
         """
+        width = main_canvas.shape[1]
+        height = main_canvas.shape[0]
         if self.cycle_ongoing:
-            cv2.putText(img=main_canvas, text=f"Time: {self.age_of_cycle:3.2f}", org=(700, 775),
+            cv2.putText(img=main_canvas, text=f"Time: {self.age_of_cycle:3.2f}", org=(width - 100, height - 25),
                         fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=1, color=(0, 0, 0))
-            cv2.putText(img=main_canvas, text=f"Num feeders: {self.live_feeders}", org=(10, 775),
+            cv2.putText(img=main_canvas, text=f"Num feeders: {self.live_feeders}", org=(10, height - 25),
                         fontFace=cv2.FONT_HERSHEY_PLAIN,
                         fontScale=1, color=(0, 0, 0))
         cv2.putText(img=main_canvas, text=f"Generation {self.generation_number}", org=(10, 10),
                     fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=1, color=(0, 0, 0))
-        cv2.putText(img=main_canvas, text=f"run #: {self.program_run_number}", org=(700, 10),
+        cv2.putText(img=main_canvas, text=f"run #: {self.program_run_number}", org=(width - 100, 10),
                     fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=1, color=(0, 0, 0))
 
     def handle_end_of_generation(self):
@@ -196,14 +366,25 @@ class GeneticAlgorithmRunner:
         generation and reset for the next generation.
         """
         self.calculate_stats_for_generation()
+        self.record_hall_of_fame()
+        if self.telemetry is not None:
+            self.publish_generation_telemetry()
+        if RECORD_LINEAGE:
+            self.record_lineage()
 
         if self.should_save_this_generation:
             self.save_generation(f"{self.save_filename}-{self.generation_number}.dat")
+            self.save_hall_of_fame()
         self.cycle_ongoing = True
-        self.update_stats_window()
-        cv2.waitKey(10)
+        if self.show_windows:
+            self.update_stats_window()
+            cv2.waitKey(10)
 
         self.advance_generation()
+        self.brain_engine.attach(self.feeder_list)
+        self.coast_schedule.reset(len(self.feeder_list))
+        self.leaderboard.reset(self.feeder_list)
+        self.forget_proximities()
 
         self.age_of_cycle = 0.0
         self.should_save_this_generation = False  # reset "s" key.
@@ -214,21 +395,77 @@ class GeneticAlgorithmRunner:
         Now that generation is over, computes the score for the best feeder and the mean of the scores for all the
         feeders for this generation and appends them to the running statistics for the various generations.
         """
-        self.feeder_list.sort(reverse=True)
+        self.feeder_list[:] = self.leaderboard.ranking()
         total_score = 0
         for feeder in self.feeder_list:
-            if feeder.age >= MAX_CYCLE_DURATION:
-                total_score += (100 + feeder.food_level)
-            else:
-                total_score += 100 * feeder.age / MAX_CYCLE_DURATION
-        self.mean_score_per_generation.append(total_score / NUM_FEEDERS)
-        if self.feeder_list[0].age >= MAX_CYCLE_DURATION:
-            self.best_score_per_generation.append(100 + self.feeder_list[0].food_level)
-        else:
-            self.best_score_per_generation.append(100 * self.feeder_list[0].age / MAX_CYCLE_DURATION)
-        if DISPLAY_GRAPH:
+            total_score += self.score_of(feeder)
+        self.mean_score_per_generation.append(total_score / len(self.feeder_list))
+        self.best_score_per_generation.append(self.score_of(self.feeder_list[0]))
+        if DISPLAY_GRAPH and self.show_windows:
             self.graph_stats_per_generations()
 
+    def publish_generation_telemetry(self):
+        """
+        reports the score history and the best TELEMETRY_TOP_GENOMES feeders of the generation that just finished
+        (self.feeder_list must be ranked) through the telemetry server.
+        """
+        self.telemetry.publish(
+            run=self.program_run_number,
+            architecture=self.architecture.describe(),
+            completed_generations=len(self.best_score_per_generation),
+            best_score_per_generation=list(self.best_score_per_generation),
+            mean_score_per_generation=list(self.mean_score_per_generation),
+            top_genomes=[{"name": bug.name, "score": self.score_of(bug), "age": bug.age,
+                          "death_reason": bug.death_reason, "genes": bug.genes.tolist()}
+                         for bug in self.feeder_list[:TELEMETRY_TOP_GENOMES]])
+
+    def score_of(self, feeder: Feeder) -> float:
+        """
+        :param feeder: a feeder that has finished this generation
+        :return: its score: up to 100 for the fraction of the generation it survived, plus its remaining food if it
+        survived the whole generation.
+        """
+        if feeder.age >= MAX_CYCLE_DURATION:
+            return 100 + feeder.food_level
+        return 100 * feeder.age / MAX_CYCLE_DURATION
+
+    def record_hall_of_fame(self):
+        """
+        archives the best HALL_OF_FAME_PER_GENERATION feeders of the generation that just finished (self.feeder_list
+        must be ranked) in the hall of fame.
+        """
+        for feeder in self.feeder_list[:HALL_OF_FAME_PER_GENERATION]:
+            self.hall_of_fame.add(feeder.genes, feeder.name_code, self.score_of(feeder), self.generation_number)
+
+    def record_lineage(self):
+        """
+        appends the generation that just finished to the lineage store: a new id for every feeder that hasn't been
+        recorded before (along with its parents' ids), and every feeder's score. A store that can't be written to stops
+        the run, rather than leaving a gap in the record.
+        """
+        lineage_directory = f"{self.save_filename}{LINEAGE_SUFFIX}"
+        if self.lineage is None or self.lineage.directory != lineage_directory:
+            # the store may hold this generation and later ones from an earlier attempt at this run; drop them, so that
+            # its generations stay in order.
+            self.lineage = LineageStore(lineage_directory)
+            self.lineage.truncate_to_generation(self.generation_number)
+        newborns = [bug for bug in self.feeder_list if bug.lineage_id == NO_PARENT]
+        new_ids = self.lineage.add_births([bug.parent_ids[0] for bug in newborns],
+                                          [bug.parent_ids[1] for bug in newborns], self.generation_number)
+        for bug, new_id in zip(newborns, new_ids.tolist()):
+            bug.lineage_id = new_id
+        self.lineage.add_evaluations([bug.lineage_id for bug in self.feeder_list], self.generation_number,
+                                     [self.score_of(bug) for bug in self.feeder_list])
+
+    def save_hall_of_fame(self):
+        """
+        writes the hall of fame to a file next to the generation files of this run.
+        """
+        try:
+            self.hall_of_fame.save(f"{self.save_filename}{HALL_OF_FAME_SUFFIX}")
+        except Exception as e:
+            print(f"An error occurred while writing the hall of fame: {e}")
+
     def graph_stats_per_generations(self):
         """
         A rather long method for drawing the graph of the best and mean scores per generation.
@@ -308,26 +545,38 @@ class GeneticAlgorithmRunner:
         """
         Time has expired for this generation, so  kill all the feeders (but preserve how much food each had.)
         """
-        for bug in self.feeder_list:
+        for bug in self.leaderboard.top(self.leaderboard.live_count):
             bug.die()
+            self.leaderboard.record_death(bug)
 
     def draw_all_feeders(self, main_canvas):
         """
-        tell each live feeder to draw itself.
+        tell each live feeder to draw itself, or stamp them all at once. The feeders draw themselves when their
+        sensors are displayed, since the sprites don't include them.
         :param main_canvas:
         """
-        for bug in self.feeder_list:
-            if bug.is_alive:
-                bug.draw_self(canvas=main_canvas, display_sensors=DISPLAY_SENSORS)
+        live_feeders = self.leaderboard.top(self.leaderboard.live_count)
+        if USE_SPRITE_RENDERER and not DISPLAY_SENSORS:
+            self.sprite_renderer.draw_feeders(main_canvas, live_feeders, show_labels=DISPLAY_FEEDER_LABELS)
+            return
+        for bug in live_feeders:
+            bug.draw_self(canvas=main_canvas, display_sensors=DISPLAY_SENSORS)
+
+    def record_deaths(self, feeders: List[Feeder]):
+        """
+        moves feeders that have just died, e.g., coasting feeders that starved as they were settled, to their places
+        among the dead.
+        :param feeders: the feeders that died
+        """
+        for bug in feeders:
+            self.leaderboard.record_death(bug)
 
     def count_live_feeders(self):
         """
         count how many feeders are still alive. If this number has dropped to zero, set self.cycle_ongoing to False.
+        The leaderboard keeps count as feeders die, so this doesn't need to look at every feeder.
         """
-        self.live_feeders = 0
-        for bug in self.feeder_list:
-            if bug.is_alive:
-                self.live_feeders += 1
+        self.live_feeders = self.leaderboard.live_count
         if self.live_feeders == 0:
             self.cycle_ongoing = False
 
@@ -337,7 +586,6 @@ class GeneticAlgorithmRunner:
         Display the window.
         """
         if self.cycle_ongoing:
-            self.feeder_list.sort(reverse=True)
             stats_canvas = np.ones((750, 600, 3), dtype=float)
             self.display_feeders(stats_canvas)
             cv2.imshow("stats", stats_canvas)
@@ -347,95 +595,149 @@ class GeneticAlgorithmRunner:
         draw all the food dots on the canvas.
         :param main_canvas:
         """
+        if USE_SPRITE_RENDERER:
+            self.sprite_renderer.draw_food(main_canvas, [f.pos for f in self.food_list])
+            return
         for f in self.food_list:
             f.draw_self(canvas=main_canvas)
 
-    def check_for_feeder_danger_collisions(self):
+    def live_feeder_state(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        determines whether any living feeders have collided with a danger, moving or non-moving. If so, the feeder should
-        die.
+        gathers the locations of the live feeders into arrays, for the vectorized interaction checks. Coasting feeders
+        are left out, since nothing is near them.
+        :return: the positions of the live feeders in the brain engine's population (sorted), their (N x 2) locations
+        and their orientations.
         """
-        for db in self.all_dangers:
-            for bug in self.feeder_list:
-                if bug.is_alive:
-                    if math.pow(db.pos[0] - bug.position[0], 2) + math.pow(db.pos[1] - bug.position[1],
-                                                                           2) < DANGER_THRESHOLD_SQUARED:
-                        bug.die()
-                        bug.food_level = 0
-                        bug.death_reason = "O"
+        coasting = self.coast_schedule.coasting.tolist()
+        indices = [i for i, bug in enumerate(self.brain_engine.feeders) if bug.is_alive and not coasting[i]]
+        positions = np.array([self.brain_engine.feeders[i].position for i in indices], dtype=float).reshape(-1, 2)
+        orientations = np.array([self.brain_engine.feeders[i].orientation for i in indices], dtype=float)
+        return np.array(indices, dtype=int), positions, orientations
 
-    def check_for_eaten_food(self):
+    def check_for_eaten_food_and_collisions(self):
         """
-        for each food item, checks whether any feeder(s) is/are touching it. If so, increase the food_level of the
-        feeder(s). Respawn the food at a new, random location.
+        for each food item, checks whether any live feeder(s) is/are touching it. If so, increase the food_level of the
+        feeder(s), and respawn the food at a new, random location. Then determines whether any living feeders have
+        collided with a danger, moving or non-moving. If so, the feeder dies.
+
+        The distances measured here are remembered by the proximity caches, so that the sensing at the start of the
+        next animation step (before which the feeders don't move) only needs to measure the moving dangers and the
+        respawned food.
         """
-        eaten_food_list: Set[Food] = set()
-        for f in self.food_list:
-            for bug in self.feeder_list:
-                if bug.is_alive:
-                    if math.pow(f.pos[0] - bug.position[0], 2) + math.pow(f.pos[1] - bug.position[1],
-                                                                          2) < FOOD_THRESHOLD_SQUARED:
-                        bug.food_level = min(100, bug.food_level + 10)
-                        eaten_food_list.add(f)
-        for ef in eaten_food_list:
-            self.food_list.remove(ef)
-            self.food_list.append(Food())
-
-    def move_all_feeders(self, delta_t):
-        """
-        perform one animation step for each live feeder.
+        indices, positions, _ = self.live_feeder_state()
+        population = self.brain_engine.feeders
+
+        food_positions = np.array([f.pos for f in self.food_list], dtype=float).reshape(-1, 2)
+        feeder_ids, food_ids, squared = self.food_proximity.near_pairs(indices, positions, food_positions)
+        eaten = squared < FOOD_THRESHOLD_SQUARED
+        for i in feeder_ids[eaten].tolist():
+            population[i].food_level = min(100, population[i].food_level + 10)
+        # eaten food is replaced where it stood in the list, so the other food items keep their places (and their
+        # remembered distances).
+        respawned = np.unique(food_ids[eaten]).tolist()
+        for food_id in respawned:
+            self.food_list[food_id] = Food(world=self.world)
+        if respawned:
+            self.record_deaths(self.coast_schedule.wake_near(
+                population, np.array([self.food_list[food_id].pos for food_id in respawned], dtype=float)))
+
+        danger_positions = np.array([db.pos for db in self.all_dangers], dtype=float).reshape(-1, 2)
+        feeder_ids, _, squared = self.danger_proximity.near_pairs(indices, positions, danger_positions)
+        for i in np.unique(feeder_ids[squared < DANGER_THRESHOLD_SQUARED]).tolist():
+            population[i].die()
+            population[i].food_level = 0
+            population[i].death_reason = "O"
+            self.leaderboard.record_death(population[i])
+
+    def move_all_feeders(self, delta_t, allow_coasting=False):
+        """
+        perform one animation step for each live feeder. All the brains are evaluated together by the brain engine
+        first, so this costs one batch of matrix multiplications rather than one brain evaluation per feeder.
         :param delta_t: the number of seconds since the last animation step.
+        :param allow_coasting: whether feeders with nothing nearby may start skipping steps, this one included.
         """
-        for bug in self.feeder_list:
-            if bug.is_alive:
-                bug.animation_step(delta_t)
+        motion_commands = self.brain_engine.motion_commands()
+        if allow_coasting:
+            self.start_coasting(delta_t)
+        coasting = self.coast_schedule.coasting.tolist()
+        for bug, motion_command, is_coasting in zip(self.brain_engine.feeders, motion_commands, coasting):
+            if bug.is_alive and not is_coasting:
+                bug.animation_step(delta_t, motion_command)
+                if not bug.is_alive:
+                    self.leaderboard.record_death(bug)
 
-    def detect_all_food(self):
+    def start_coasting(self, delta_t):
         """
-        tell each feeder to update its sensors about all food in its range.
+        sets the live feeders that sense nothing this step coasting for as many steps as they safely can (if at least
+        two).
+        :param delta_t: the number of seconds per animation step.
         """
-        for f in self.food_list:
-            for bug in self.feeder_list:
-                if bug.is_alive:
-                    bug.detect(f.pos, False)
+        indices, positions, _ = self.live_feeder_state()
+        quiet = ~self.brain_engine.sensors[indices].any(axis=1)
+        indices, positions = indices[quiet], positions[quiet]
+        feeders = [self.brain_engine.feeders[i] for i in indices.tolist()]
+        num_steps = safe_coast_steps(positions,
+                                     np.array([bug.speed for bug in feeders], dtype=float),
+                                     np.array([bug.food_level for bug in feeders], dtype=float),
+                                     np.array([f.pos for f in self.food_list], dtype=float).reshape(-1, 2),
+                                     np.array([db.pos for db in self.all_dangers], dtype=float).reshape(-1, 2),
+                                     fastest_danger_speed([db.velocity for db in self.moving_danger_list]),
+                                     delta_t)
+        worthwhile = num_steps >= 2
+        self.coast_schedule.begin(indices[worthwhile], num_steps[worthwhile], delta_t)
 
-    def detect_all_dangers(self):
+    def detect_all_food_and_dangers(self):
         """
-        tell each feeder to update its sensors about all dangers in its range.
+        update the sensors of each live feeder about all the food and dangers in its range, exactly as Feeder.detect()
+        would, but for all the feeders at once.
         """
-        for db in self.all_dangers:
-            for bug in self.feeder_list:
-                if bug.is_alive:
-                    bug.detect(db.pos, True)
+        indices, positions, orientations = self.live_feeder_state()
+        row_of = np.zeros(len(self.brain_engine.feeders), dtype=int)
+        row_of[indices] = np.arange(len(indices))
+
+        danger_positions = np.array([db.pos for db in self.all_dangers], dtype=float).reshape(-1, 2)
+        food_positions = np.array([f.pos for f in self.food_list], dtype=float).reshape(-1, 2)
+        for proximity, targets, radius, first_sensor in (
+                (self.danger_proximity, danger_positions, DANGER_SENSOR_RADIUS, NUM_SENSORS),
+                (self.food_proximity, food_positions, FOOD_SENSOR_RADIUS, 0)):
+            feeder_ids, target_ids, squared = proximity.near_pairs(indices, positions, targets)
+            rows = row_of[feeder_ids]
+            proximities = 1.0 - np.sqrt(squared) / radius
+            theta = np.arctan2(targets[target_ids, 1] - positions[rows, 1], targets[target_ids, 0] - positions[rows, 0])
+            offset_diff = (theta - orientations[rows] + math.pi) % (2 * math.pi)
+            sensor = (offset_diff / (2 * math.pi) * NUM_SENSORS + 0.5).astype(int) % NUM_SENSORS
+            np.maximum.at(self.brain_engine.sensors, (feeder_ids, sensor + first_sensor), proximities)
 
     def move_and_draw_dangers(self, delta_t, main_canvas):
         """
         animation step for all mobile dangers
         :param delta_t: the number of seconds since the last animation step
-        :param main_canvas: the screen on which to draw them.
+        :param main_canvas: the screen on which to draw them, or None to skip drawing.
         """
         for db in self.moving_danger_list:
             db.animate_step(delta_t)
-            if GRAPHIC_SIMULATION:
+            if main_canvas is not None and not USE_SPRITE_RENDERER:
                 db.draw_self(main_canvas)
+        if main_canvas is not None and USE_SPRITE_RENDERER:
+            self.sprite_renderer.draw_dangers(main_canvas, [db.pos for db in self.moving_danger_list])
 
     def clear_all_live_feeder_sensors(self):
         """
-        refresh all the sensors for all the live feeders, in preparation to receive information about the world for
+        refresh all the sensors for all the feeders, in preparation to receive information about the world for
         this animation step.
         """
-        for bug in self.feeder_list:
-            if bug.is_alive:
-                bug.clear_sensors()
+        self.brain_engine.clear_sensors()
 
     def initial_setup(self):
         """
-        ask the user whether to load a data file of genes for a given generation.
+        ask the user whether to load a data file of genes for a given generation, or a checkpoint to resume a run.
         """
-        load_YN = input("Do you want to load an existing generation? (Y/N) ").lower()
+        load_YN = input("Do you want to load an existing generation or checkpoint? (Y/N) ").lower()
         if load_YN == 'y':
             load_filename = input("Enter the name of the file, or type 'cancel' to change your mind. ")
-            if load_filename != "cancel":
+            if load_filename.endswith(CHECKPOINT_SUFFIX):
+                self.load_checkpoint(filename=load_filename)
+            elif load_filename != "cancel":
                 self.load_generation(filename=load_filename)
 
         self.save_filename = f"generation {self.program_run_number}"
@@ -445,10 +747,12 @@ class GeneticAlgorithmRunner:
 
     def save_generation(self, filename):
         """
-        save information about the generation that just finished to a file, so that it can be loaded later.
+        save information about the generation that just finished to a file, so that it can be loaded later. The
+        brain architecture is recorded on the third line, since it determines how many genes each feeder has.
         :param filename:
         """
         text_to_write = f"{self.program_run_number}\n{self.generation_number}\n"
+        text_to_write += f"{BRAIN_HEADER}{self.architecture.describe()}\n"
         for bug in self.feeder_list:
             text_to_write += bug.name
             for i in range(len(bug.genes)):
@@ -464,7 +768,9 @@ class GeneticAlgorithmRunner:
     def load_generation(self, filename):
         """
         read generation data from a file and set up the collection of feeders from this information, along with
-        the "run number" and generation number to match the file.
+        the "run number", generation number and brain architecture to match the file. Files without a brain line
+        hold the original 64-gene brains. The population has self.world.num_feeders feeders, however many the file
+        holds.
         :param filename:
         """
         all_weights: List[List[float]] = []
@@ -474,6 +780,10 @@ class GeneticAlgorithmRunner:
                 self.generation_number = int(file.readline())
                 names: List[str] = []
                 line = file.readline()
+                architecture = DEFAULT_ARCHITECTURE
+                if line.startswith(BRAIN_HEADER):
+                    architecture = BrainArchitecture.parse(line[len(BRAIN_HEADER):])
+                    line = file.readline()
                 while line:
                     parts = line.split("\t")
                     names.append(parts[0])
@@ -483,10 +793,198 @@ class GeneticAlgorithmRunner:
                         weights.append(float(weight_string))
                     all_weights.append(weights)
                     line = file.readline()
+            for weights in all_weights:
+                if len(weights) != architecture.gene_length:
+                    raise ValueError(f"Found {len(weights)} genes, but a {architecture.describe()} brain needs "
+                                     f"{architecture.gene_length}.")
+            self.architecture = architecture
+            self.brain_engine = BrainEngine(architecture)
+            if self.hall_of_fame.gene_length != architecture.gene_length:
+                self.hall_of_fame = HallOfFame(architecture.gene_length)
+            # the population keeps the world's size: extra feeders in the file are left out, and missing ones are
+            # made up with random newcomers.
+            if len(all_weights) != self.world.num_feeders:
+                print(f"{filename} holds {len(all_weights)} feeders; using {self.world.num_feeders}.")
+            all_weights, names = all_weights[:self.world.num_feeders], names[:self.world.num_feeders]
+            while len(all_weights) < self.world.num_feeders:
+                newcomer = Feeder(world=self.world, architecture=architecture)
+                all_weights.append(newcomer.genes.tolist())
+                names.append(newcomer.name)
             self.reset_feeder_list(all_weights, names)
+            # the loaded feeders start new family trees. record_lineage() reopens the run's store, cutting off this
+            # generation and any later ones it holds already.
+            self.save_filename = f"generation {self.program_run_number}"
+            self.lineage = None
         except Exception as e:
             print(f"Problem opening file: {e}")
 
+    def save_checkpoint(self, filename):
+        """
+        save the complete state of this run - the world, every feeder (mid-generation or not), the score history and
+        the random number generators - so that the run can be resumed exactly where it left off, even after a crash.
+        :param filename: the checkpoint file to write; it is replaced atomically.
+        """
+        population = self.brain_engine.feeders
+        self.record_deaths(self.coast_schedule.settle_all(population, self.coast_schedule.step))
+        position_in_population = {id(bug): i for i, bug in enumerate(population)}
+        arrays: Dict[str, np.ndarray] = {
+            "program_run_number": np.array(self.program_run_number),
+            "generation_number": np.array(self.generation_number),
+            "age_of_cycle": np.array(self.age_of_cycle),
+            "cycle_ongoing": np.array(self.cycle_ongoing),
+            "should_save_this_generation": np.array(self.should_save_this_generation),
+            "live_feeders": np.array(self.live_feeders),
+            "best_score_per_generation": np.array(self.best_score_per_generation, dtype=float),
+            "mean_score_per_generation": np.array(self.mean_score_per_generation, dtype=float),
+            "world_size": np.array([self.world.width, self.world.height]),
+            "world_counts": np.array([self.world.num_feeders, self.world.num_food, self.world.num_moving_dangers]),
+            "architecture": np.array(self.architecture.describe()),
+            "feeder_genes": self.brain_engine.genes,
+            "feeder_name_codes": np.array([bug.name_code for bug in population], dtype=np.int64),
+            "feeder_lineage": np.array([[bug.lineage_id, *bug.parent_ids] for bug in population],
+                                       dtype=np.int64).reshape(-1, 3),
+            "lineage_rows": np.array([self.lineage.num_births, self.lineage.num_evaluations] if self.lineage
+                                     else [0, 0]),
+            "hall_of_fame_count": np.array(self.hall_of_fame.count),
+            "feeder_colors": np.array([bug.color for bug in population], dtype=float).reshape(-1, 3),
+            "feeder_positions": np.array([bug.position for bug in population], dtype=float).reshape(-1, 2),
+            "feeder_motion": np.array([[bug.orientation, bug.speed, bug.turn_ratio] for bug in population],
+                                      dtype=float).reshape(-1, 3),
+            "feeder_food_levels": np.array([bug.food_level for bug in population], dtype=float),
+            "feeder_ages": np.array([bug.age for bug in population], dtype=float),
+            "feeder_is_alive": np.array([bug.is_alive for bug in population], dtype=bool),
+            "feeder_death_reasons": np.array([bug.death_reason for bug in population], dtype=str),
+            "feeder_ranking": np.array([position_in_population[id(bug)] for bug in self.leaderboard.ranking()],
+                                       dtype=int),
+            "num_moving_dangers": np.array(len(self.moving_danger_list)),
+            "danger_positions": np.array([db.pos for db in self.all_dangers], dtype=float).reshape(-1, 2),
+            "danger_velocities": np.array([db.velocity for db in self.all_dangers], dtype=float).reshape(-1, 2),
+            "food_positions": np.array([f.pos for f in self.food_list], dtype=int).reshape(-1, 2),
+            **random_states_to_arrays()}
+        try:
+            write_checkpoint(filename, arrays)
+        except Exception as e:
+            print(f"An error occurred while writing checkpoint {filename}: {e}")
+        self.save_hall_of_fame()
+
+    def load_checkpoint(self, filename):
+        """
+        resume a run from a checkpoint written by save_checkpoint(), replacing the world, the feeders, the score
+        history and the state of the random number generators. The whole checkpoint is read before any of this runner
+        is replaced, so a damaged or incomplete one leaves the runner as it was.
+        :param filename: the checkpoint file to read
+        """
+        python_random_state, numpy_random_state = random.getstate(), np.random.get_state()
+        try:
+            arrays = read_checkpoint(filename)
+            width, height = (int(value) for value in arrays["world_size"])
+            num_feeders, num_food, num_moving_dangers = (int(value) for value in arrays["world_counts"])
+            world = WorldConfig(width=width, height=height, num_feeders=num_feeders, num_food=num_food,
+                                num_moving_dangers=num_moving_dangers, viewport_size=max(self.main_canvas.shape[:2]))
+            architecture = BrainArchitecture.parse(str(arrays["architecture"]))
+
+            population: List[Feeder] = []
+            for i in range(len(arrays["feeder_genes"])):
+                bug = Feeder(genes=arrays["feeder_genes"][i].tolist(), world=world, architecture=architecture)
+                if "feeder_name_codes" in arrays:
+                    bug.name_code = int(arrays["feeder_name_codes"][i])
+                else:  # checkpoints from before name codes hold the names themselves.
+                    bug.name = str(arrays["feeder_names"][i])
+                if "feeder_lineage" in arrays:
+                    lineage_id, parent_a, parent_b = arrays["feeder_lineage"][i].tolist()
+                    bug.lineage_id, bug.parent_ids = lineage_id, (parent_a, parent_b)
+                bug.color = tuple(arrays["feeder_colors"][i].tolist())
+                bug.position = arrays["feeder_positions"][i].tolist()
+                bug.orientation, bug.speed, bug.turn_ratio = arrays["feeder_motion"][i].tolist()
+                bug.food_level = float(arrays["feeder_food_levels"][i])
+                bug.age = float(arrays["feeder_ages"][i])
+                bug.is_alive = bool(arrays["feeder_is_alive"][i])
+                bug.death_reason = str(arrays["feeder_death_reasons"][i])
+                population.append(bug)
+            feeder_list = [population[i] for i in arrays["feeder_ranking"].tolist()]
+            if sorted(arrays["feeder_ranking"].tolist()) != list(range(len(population))):
+                raise ValueError("The feeder ranking doesn't rank every feeder once.")
+
+            num_moving = int(arrays["num_moving_dangers"])
+            all_dangers = [DangerBall(pos=pos, vel=vel, world=world)
+                           for pos, vel in zip(arrays["danger_positions"].tolist(),
+                                               arrays["danger_velocities"].tolist())]
+            food_list = [Food(world=world, pos=tuple(pos)) for pos in arrays["food_positions"].tolist()]
+
+            program_run_number = int(arrays["program_run_number"])
+            generation_number = int(arrays["generation_number"])
+            age_of_cycle = float(arrays["age_of_cycle"])
+            cycle_ongoing = bool(arrays["cycle_ongoing"])
+            should_save_this_generation = bool(arrays["should_save_this_generation"])
+            live_feeders = int(arrays["live_feeders"])
+            best_score_per_generation = arrays["best_score_per_generation"].tolist()
+            mean_score_per_generation = arrays["mean_score_per_generation"].tolist()
+
+            # the run's other files are named after its run number, as when it was saved, whatever this file is called.
+            save_filename = f"generation {program_run_number}"
+            # the hall of fame is saved at the end of every generation, so it may have grown past the checkpoint; keep
+            # only what it held then.
+            hall_of_fame_count = int(arrays["hall_of_fame_count"]) if "hall_of_fame_count" in arrays else None
+            hall_of_fame_filename = f"{save_filename}{HALL_OF_FAME_SUFFIX}"
+            if os.path.exists(hall_of_fame_filename):
+                hall_of_fame = HallOfFame.load(hall_of_fame_filename, hall_of_fame_count)
+            else:
+                hall_of_fame = HallOfFame(architecture.gene_length)
+            if hall_of_fame_count is not None and hall_of_fame.count < hall_of_fame_count:
+                print(f"{hall_of_fame_filename} holds only {hall_of_fame.count} of the {hall_of_fame_count} genomes "
+                      f"in the hall of fame when the checkpoint was written.")
+            lineage_rows = [int(rows) for rows in arrays["lineage_rows"]] if "lineage_rows" in arrays else None
+            lineage = LineageStore(f"{save_filename}{LINEAGE_SUFFIX}") if RECORD_LINEAGE else None
+
+            # the generators go last, since building the feeders, dangers and food above drew random numbers.
+            restore_random_states(arrays)
+        except Exception as e:
+            random.setstate(python_random_state)
+            np.random.set_state(numpy_random_state)
+            print(f"Problem opening checkpoint: {e}")
+            return
+
+        self.world = world
+        screen_width, screen_height = self.world.screen_size()
+        self.main_canvas = np.ones((screen_height, screen_width, 3), dtype=float)
+        self.sprite_renderer = SpriteRenderer(self.world)
+        self.architecture = architecture
+        self.brain_engine = BrainEngine(self.architecture)
+        self.brain_engine.attach(population)
+        self.coast_schedule.reset(len(population))
+        self.feeder_list = feeder_list
+        self.leaderboard.reset(self.feeder_list)
+        self.all_dangers = all_dangers
+        self.moving_danger_list = self.all_dangers[:num_moving]
+        self.food_list = food_list
+        self.forget_proximities()
+
+        self.program_run_number = program_run_number
+        self.save_filename = save_filename
+        self.generation_number = generation_number
+        self.age_of_cycle = age_of_cycle
+        self.cycle_ongoing = cycle_ongoing
+        self.should_save_this_generation = should_save_this_generation
+        self.live_feeders = live_feeders
+        self.best_score_per_generation = best_score_per_generation
+        self.mean_score_per_generation = mean_score_per_generation
+
+        self.hall_of_fame = hall_of_fame
+        # the lineage store may have grown past the checkpoint; cut it back so the resumed run appends where it left off.
+        self.lineage = lineage
+        if lineage is not None:
+            if lineage_rows is not None and lineage.num_births >= lineage_rows[0] \
+                    and lineage.num_evaluations >= lineage_rows[1]:
+                lineage.truncate(*lineage_rows)
+            else:
+                # the store doesn't go back as far as the checkpoint (or the checkpoint is older than lineage records),
+                # so the feeders' ids mean nothing in it: they start new family trees here.
+                lineage.truncate_to_generation(self.generation_number)
+                for bug in population:
+                    bug.lineage_id, bug.parent_ids = NO_PARENT, (NO_PARENT, NO_PARENT)
+        print(f"Resumed run {self.program_run_number} at generation {self.generation_number}, "
+              f"{self.age_of_cycle:3.2f} seconds in.")
+
     def advance_generation(self):
         """
         Precondition: All the feeders have died off, either from collisions with dangers, starvation, or the simulation
@@ -495,7 +993,13 @@ class GeneticAlgorithmRunner:
         danger; you may wish to check the feeder's age to see whether it is below some threshold and give them a second
         chance. Or not... luck may be part of your breeding program!
 
-        Postcondition: self.feeder_list contains NUM_FEEDERS feeders, new ones and/or rejuvenated returning ones, ready
+        self.hall_of_fame holds the best feeders of every generation so far: self.hall_of_fame.known_score(genes,
+        epsilon) tells you whether something within epsilon of a child's genes has been evaluated before (and how it
+        did), so you might skip breeding near-duplicates; self.hall_of_fame.nearest(genes, k) finds the k most similar
+        elites. Children made by have_sex() and get_mutated_version_of_Feeder() remember their parents, so the lineage
+        store (self.lineage) can trace their ancestry; returning feeders keep their ids.
+
+        Postcondition: self.feeder_list contains self.world.num_feeders feeders, new ones and/or rejuvenated returning ones, ready
         to act as the next generation. These might be:
         • returning successful feeders, rejuvenated
         • children of feeder pairs
@@ -511,7 +1015,29 @@ class GeneticAlgorithmRunner:
             bug.rejuvenate()
 
 if __name__ == "__main__":
-    gar = GeneticAlgorithmRunner()
+    parser = argparse.ArgumentParser(description="Evolve feeders that seek food and avoid dangers.")
+    parser.add_argument("--width", type=int, default=DEFAULT_WORLD.width, help="width of the arena")
+    parser.add_argument("--height", type=int, default=DEFAULT_WORLD.height, help="height of the arena")
+    parser.add_argument("--feeders", type=int, default=DEFAULT_WORLD.num_feeders, help="number of feeders")
+    parser.add_argument("--food", type=int, default=DEFAULT_WORLD.num_food, help="number of food items")
+    parser.add_argument("--dangers", type=int, default=DEFAULT_WORLD.num_moving_dangers,
+                        help="number of moving dangers")
+    parser.add_argument("--hidden", type=str, default="",
+                        help="comma-separated sizes of the brain's hidden layers, e.g. '8,8'; none by default")
+    parser.add_argument("--activation", type=str, default="tanh", choices=sorted(ACTIVATIONS),
+                        help="activation function of the hidden layers")
+    parser.add_argument("--viewport", type=int, default=DEFAULT_VIEWPORT_SIZE,
+                        help="largest dimension of the simulation window, in pixels")
+    parser.add_argument("--telemetry-port", type=int, default=None,
+                        help="serve live status as JSON on this local port, and take 'save' and 'stop' commands")
+    args = parser.parse_args()
+    TELEMETRY_PORT = args.telemetry_port
+    gar = GeneticAlgorithmRunner(WorldConfig(width=args.width, height=args.height, num_feeders=args.feeders,
+                                             num_food=args.food, num_moving_dangers=args.dangers,
+                                             viewport_size=args.viewport),
+                                 BrainArchitecture(num_inputs=2 * NUM_SENSORS,
+                                                   hidden_layers=[int(size) for size in args.hidden.split(",") if size],
+                                                   activation=args.activation))
     gar.initial_setup()
     gar.animation_loop()
     cv2.destroyAllWindows()
@@ -0,0 +1,273 @@
+import heapq
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from CheckpointFile import write_checkpoint, read_checkpoint
+
+HALL_OF_FAME_SUFFIX = ".halloffame.npz"
+KD_LEAF_SIZE = 32  # the most genomes in one leaf of a k-d tree; leaves are searched by brute force.
+BUFFER_SIZE = 256  # how many new genomes to collect (and search by brute force) before indexing them in a tree.
+
+
+class GenomeKDTree:
+    """
+    A static k-d tree over a set of genomes. Each internal node splits its genomes at the median of the gene with the
+    widest spread (those no greater go left, those no less go right); each leaf holds at most KD_LEAF_SIZE genomes,
+    stored contiguously in self.order.
+    """
+
+    def __init__(self, points: np.ndarray, ids: np.ndarray):
+        """
+        :param points: an (N x gene_length) array of genomes
+        :param ids: the N ids (e.g., positions in the hall of fame) to report for these genomes
+        """
+        self.points = points
+        self.ids = ids
+        self.order = np.arange(len(points))
+        # per node: the gene to split on (-1 for a leaf), the value to split at, the two children, and for a leaf,
+        # the slice of self.order that it holds.
+        self.split_gene: List[int] = []
+        self.split_value: List[float] = []
+        self.children: List[Tuple[int, int]] = []
+        self.leaf_range: List[Tuple[int, int]] = []
+        self._build()
+
+    def _add_node(self, start: int, end: int) -> int:
+        self.split_gene.append(-1)
+        self.split_value.append(0.0)
+        self.children.append((-1, -1))
+        self.leaf_range.append((start, end))
+        return len(self.split_gene) - 1
+
+    def _build(self):
+        stack = [(self._add_node(0, len(self.points)), 0, len(self.points))]
+        while stack:
+            node, start, end = stack.pop()
+            if end - start <= KD_LEAF_SIZE:
+                continue
+            members = self.order[start:end]
+            values = self.points[members]
+            gene = int(np.argmax(values.max(axis=0) - values.min(axis=0)))
+            middle = (end - start) // 2
+            partition = np.argpartition(values[:, gene], middle)
+            self.order[start:end] = members[partition]
+            split_value = float(self.points[self.order[start + middle], gene])
+            if values[:, gene].max() == values[:, gene].min():
+                continue  # all identical along the widest gene, so they are all identical: keep them in one leaf.
+            left = self._add_node(start, start + middle)
+            right = self._add_node(start + middle, end)
+            self.split_gene[node] = gene
+            self.split_value[node] = split_value
+            self.children[node] = (left, right)
+            stack.append((left, start, start + middle))
+            stack.append((right, start + middle, end))
+
+    def within(self, genes: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param genes: the genome to search around
+        :param radius: the largest (Euclidean) distance to report
+        :return: the ids of the genomes within radius of genes, and their distances.
+        """
+        found_ids, found_distances = [], []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            gene = self.split_gene[node]
+            if gene < 0:
+                start, end = self.leaf_range[node]
+                members = self.order[start:end]
+                distances = np.sqrt(((self.points[members] - genes) ** 2).sum(axis=1))
+                close = distances <= radius
+                found_ids.append(self.ids[members[close]])
+                found_distances.append(distances[close])
+                continue
+            offset = genes[gene] - self.split_value[node]
+            left, right = self.children[node]
+            if offset - radius <= 0:
+                stack.append(left)
+            if offset + radius >= 0:
+                stack.append(right)
+        if not found_ids:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        return np.concatenate(found_ids), np.concatenate(found_distances)
+
+    def nearest(self, genes: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """
+        :param genes: the genome to search around
+        :param k: how many genomes to find
+        :return: up to k (distance, id) pairs for the genomes closest to genes, closest first; none if k < 1.
+        """
+        if k < 1:
+            return []
+        best: List[Tuple[float, int]] = []  # a max-heap of the k closest so far, as (-distance, id).
+        frontier = [(0.0, 0)]  # a min-heap of (lower bound on distance, node).
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if len(best) == k and bound > -best[0][0]:
+                break
+            gene = self.split_gene[node]
+            if gene < 0:
+                start, end = self.leaf_range[node]
+                members = self.order[start:end]
+                distances = np.sqrt(((self.points[members] - genes) ** 2).sum(axis=1))
+                for distance, member in zip(distances.tolist(), members.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, int(self.ids[member])))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, int(self.ids[member])))
+                continue
+            offset = genes[gene] - self.split_value[node]
+            near, far = self.children[node] if offset < 0 else self.children[node][::-1]
+            heapq.heappush(frontier, (bound, near))
+            heapq.heappush(frontier, (max(bound, abs(offset)), far))
+        return sorted((-negative_distance, genome_id) for negative_distance, genome_id in best)
+
+
+class HallOfFame:
+    """
+    An archive of notable genomes - their name codes, genes, scores and the generation they were scored in - with an
+    index for finding genomes near a given one without comparing it to every genome in the archive.
+
+    The index is a set of k-d trees whose sizes are BUFFER_SIZE times distinct powers of two, plus a small buffer of
+    the newest genomes: adding a genome occasionally merges trees like carrying in a binary counter, so the cost of
+    building trees stays O(log n) per genome, and a query searches O(log n) trees.
+    """
+
+    def __init__(self, gene_length: int):
+        self.gene_length = gene_length
+        self.count = 0
+        self.genes = np.zeros((BUFFER_SIZE, gene_length))
+        self.name_codes = np.zeros(BUFFER_SIZE, dtype=np.int64)
+        self.scores = np.zeros(BUFFER_SIZE)
+        self.generations = np.zeros(BUFFER_SIZE, dtype=np.int64)
+        self.trees: List[Optional[GenomeKDTree]] = []
+        self.buffer_start = 0  # genomes from here to self.count are not in any tree yet.
+
+    def add(self, genes: np.ndarray, name_code: int, score: float, generation: int):
+        """
+        archive one genome.
+        :param genes: its genes
+        :param name_code: the code of its name
+        :param score: how well it did
+        :param generation: the generation in which it earned that score
+        """
+        if len(genes) != self.gene_length:
+            raise ValueError(f"This hall of fame holds {self.gene_length} genes per genome, not {len(genes)}.")
+        if self.count == len(self.genes):
+            self._grow()
+        self.genes[self.count] = genes
+        self.name_codes[self.count] = name_code
+        self.scores[self.count] = score
+        self.generations[self.count] = generation
+        self.count += 1
+        if self.count - self.buffer_start == BUFFER_SIZE:
+            self._index_buffer()
+
+    def _grow(self):
+        capacity = 2 * len(self.genes)
+        self.genes = np.resize(self.genes, (capacity, self.gene_length))
+        self.name_codes = np.resize(self.name_codes, capacity)
+        self.scores = np.resize(self.scores, capacity)
+        self.generations = np.resize(self.generations, capacity)
+
+    def _index_buffer(self):
+        carried = np.arange(self.buffer_start, self.count)
+        level = 0
+        while level < len(self.trees) and self.trees[level] is not None:
+            carried = np.concatenate((self.trees[level].ids, carried))
+            self.trees[level] = None
+            level += 1
+        if level == len(self.trees):
+            self.trees.append(None)
+        self.trees[level] = GenomeKDTree(self.genes[carried], carried)
+        self.buffer_start = self.count
+
+    def within(self, genes: np.ndarray, epsilon: float) -> List[int]:
+        """
+        :param genes: a genome
+        :param epsilon: the largest (Euclidean) distance to look
+        :return: the positions in this archive of every genome within epsilon of genes.
+        """
+        genes = np.asarray(genes, dtype=float)
+        found = [tree.within(genes, epsilon)[0] for tree in self.trees if tree is not None]
+        buffered = self.genes[self.buffer_start:self.count]
+        found.append(np.arange(self.buffer_start, self.count)[np.sqrt(((buffered - genes) ** 2).sum(axis=1))
+                                                                <= epsilon])
+        return sorted(np.concatenate(found).tolist())
+
+    def nearest(self, genes: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """
+        :param genes: a genome
+        :param k: how many genomes to find
+        :return: up to k (distance, position in this archive) pairs for the genomes most similar to genes, closest
+        first; none if k < 1.
+        """
+        if k < 1:
+            return []
+        genes = np.asarray(genes, dtype=float)
+        candidates: List[Tuple[float, int]] = []
+        for tree in self.trees:
+            if tree is not None:
+                candidates.extend(tree.nearest(genes, k))
+        buffered = np.sqrt(((self.genes[self.buffer_start:self.count] - genes) ** 2).sum(axis=1))
+        candidates.extend(zip(buffered.tolist(), range(self.buffer_start, self.count)))
+        return heapq.nsmallest(k, candidates)
+
+    def known_score(self, genes: np.ndarray, epsilon: float) -> Optional[float]:
+        """
+        answers "have we already evaluated something within epsilon of this genome?"
+        :param genes: a genome, e.g., of a newly bred child
+        :param epsilon: how close counts as the same genome
+        :return: the best score of the archived genomes within epsilon, or None if there are none.
+        """
+        matches = self.within(genes, epsilon)
+        if not matches:
+            return None
+        return float(self.scores[matches].max())
+
+    def save(self, filename: str):
+        """
+        write this archive to a file, atomically. The index is rebuilt when the file is loaded.
+        :param filename: the file to (over)write
+        """
+        write_checkpoint(filename, {"genes": self.genes[:self.count],
+                                    "name_codes": self.name_codes[:self.count],
+                                    "scores": self.scores[:self.count],
+                                    "generations": self.generations[:self.count]})
+
+    @staticmethod
+    def load(filename: str, count: Optional[int] = None) -> "HallOfFame":
+        """
+        :param filename: a file written by save()
+        :param count: how many of its genomes to keep, oldest first, e.g., to match a checkpoint written before the
+        file was last saved; None keeps them all
+        :return: the archive it holds.
+        """
+        arrays = read_checkpoint(filename)
+        hall_of_fame = HallOfFame(arrays["genes"].shape[1])
+        count = len(arrays["scores"]) if count is None else min(count, len(arrays["scores"]))
+        capacity = max(BUFFER_SIZE, 2 ** math.ceil(math.log2(max(1, count))))
+        hall_of_fame.genes = np.zeros((capacity, hall_of_fame.gene_length))
+        hall_of_fame.name_codes = np.zeros(capacity, dtype=np.int64)
+        hall_of_fame.scores = np.zeros(capacity)
+        hall_of_fame.generations = np.zeros(capacity, dtype=np.int64)
+        hall_of_fame.genes[:count] = arrays["genes"][:count]
+        hall_of_fame.name_codes[:count] = arrays["name_codes"][:count]
+        hall_of_fame.scores[:count] = arrays["scores"][:count]
+        hall_of_fame.generations[:count] = arrays["generations"][:count]
+        hall_of_fame.count = count
+        # index everything but the last partial buffer, as one tree per set bit of count // BUFFER_SIZE, just as if
+        # the genomes had been added one at a time.
+        start = 0
+        for level in reversed(range((count // BUFFER_SIZE).bit_length())):
+            if (count // BUFFER_SIZE) >> level & 1:
+                size = BUFFER_SIZE << level
+                ids = np.arange(start, start + size)
+                while len(hall_of_fame.trees) <= level:
+                    hall_of_fame.trees.append(None)
+                hall_of_fame.trees[level] = GenomeKDTree(hall_of_fame.genes[ids], ids)
+                start += size
+        hall_of_fame.buffer_start = start
+        return hall_of_fame
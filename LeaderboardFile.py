@@ -0,0 +1,66 @@
+import bisect
+import itertools
+from typing import Dict, Iterable, List, Tuple
+
+from FeederFile import Feeder
+
+
+class Leaderboard:
+    """
+    Keeps the feeders of the current generation ranked without re-sorting them every frame. A feeder's score only
+    stops changing when it dies, so the dead are kept in order (oldest first, then the most food), and each death is
+    slotted into place as it happens. The live feeders are tied at the top, in the order they were given.
+    """
+
+    def __init__(self):
+        self.live: Dict[int, Feeder] = {}  # live feeders by id(); a dict keeps their order and removes in O(1).
+        self.dead: List[Feeder] = []
+        self.dead_keys: List[Tuple[float, float]] = []  # (-age, -food_level) of each dead feeder, ascending.
+
+    def reset(self, feeders: Iterable[Feeder]):
+        """
+        start ranking a new set of feeders. Any that are already dead are slotted into the ranking in the order given.
+        :param feeders: the feeders to rank
+        """
+        self.live.clear()
+        self.dead.clear()
+        self.dead_keys.clear()
+        for bug in feeders:
+            if bug.is_alive:
+                self.live[id(bug)] = bug
+            else:
+                self._insert_dead(bug)
+
+    def record_death(self, bug: Feeder):
+        """
+        move a feeder that has just died from the live feeders to its place among the dead. Call this once the
+        feeder's age and food_level are final.
+        :param bug: the feeder that died
+        """
+        if self.live.pop(id(bug), None) is not None:
+            self._insert_dead(bug)
+
+    def _insert_dead(self, bug: Feeder):
+        key = (-bug.age, -bug.food_level)
+        index = bisect.bisect_right(self.dead_keys, key)  # after any equal scores, so earlier deaths stay ahead.
+        self.dead_keys.insert(index, key)
+        self.dead.insert(index, bug)
+
+    @property
+    def live_count(self) -> int:
+        return len(self.live)
+
+    def top(self, count: int) -> List[Feeder]:
+        """
+        :param count: how many feeders to return
+        :return: the (at most) count best-ranked feeders, best first.
+        """
+        return list(itertools.islice(itertools.chain(self.live.values(), self.dead), count))
+
+    def ranking(self) -> List[Feeder]:
+        """
+        :return: all the feeders, best first: the live ones, then the dead by age and then food_level. Once all the
+        feeders have died, this is the order that sorting them with Feeder.__lt__ in reverse would give, except that
+        feeders with equal scores stay in the order they died.
+        """
+        return list(self.live.values()) + self.dead
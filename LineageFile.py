@@ -0,0 +1,218 @@
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+LINEAGE_SUFFIX = ".lineage"
+NO_PARENT = -1
+
+# the columns of the store: one binary file of raw values each. A feeder's id is its row in the births columns.
+BIRTH_COLUMNS: Dict[str, np.dtype] = {"parent_a": np.dtype(np.int64),
+                                      "parent_b": np.dtype(np.int64),
+                                      "birth_generation": np.dtype(np.int32)}
+EVALUATION_COLUMNS: Dict[str, np.dtype] = {"feeder_id": np.dtype(np.int64),
+                                           "generation": np.dtype(np.int32),
+                                           "score": np.dtype(np.float64)}
+
+
+class LineageStore:
+    """
+    An append-only, on-disk record of every feeder of a run - who its parents were and when it was born - and of every
+    score it earned. Each column is a flat binary file that only ever grows at the end, so recording a generation
+    costs a few small appends, and queries read the columns through memory maps instead of loading them.
+
+    Ids are handed out in order of birth and each generation's births are appended together, so a parent's id is
+    always smaller than its children's, births are sorted by generation, and so are evaluations. The queries rely on
+    that order, so the store refuses to record a generation earlier than one it already holds; a run that goes back to
+    an earlier generation must cut the store back first, with truncate_to_generation().
+    """
+
+    def __init__(self, directory: str):
+        """
+        opens the store in the given directory, creating it if need be. If a crash left some columns longer than
+        others, they are cut back to the last complete row.
+        :param directory: the directory holding the column files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.num_births = self._complete_rows(BIRTH_COLUMNS)
+        self.num_evaluations = self._complete_rows(EVALUATION_COLUMNS)
+        self.truncate(self.num_births, self.num_evaluations)
+        self._maps: Dict[str, np.ndarray] = {}
+        self._child_index: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _path(self, column: str) -> str:
+        return os.path.join(self.directory, f"{column}.bin")
+
+    def _complete_rows(self, columns: Dict[str, np.dtype]) -> int:
+        return min(os.path.getsize(self._path(name)) // dtype.itemsize if os.path.exists(self._path(name)) else 0
+                   for name, dtype in columns.items())
+
+    def _append(self, columns: Dict[str, np.dtype], values: Dict[str, np.ndarray]):
+        for name, dtype in columns.items():
+            with open(self._path(name), "ab") as file:
+                np.asarray(values[name], dtype=dtype).tofile(file)
+
+    def truncate(self, num_births: int, num_evaluations: int):
+        """
+        cuts the store back to its first num_births births and num_evaluations evaluations, e.g., to match a checkpoint
+        that the run is resuming from.
+        :param num_births: how many births to keep
+        :param num_evaluations: how many evaluations to keep
+        """
+        for columns, rows in ((BIRTH_COLUMNS, num_births), (EVALUATION_COLUMNS, num_evaluations)):
+            for name, dtype in columns.items():
+                with open(self._path(name), "ab") as file:
+                    file.truncate(rows * dtype.itemsize)
+        self.num_births = num_births
+        self.num_evaluations = num_evaluations
+        self._maps = {}
+        self._child_index = None
+
+    def truncate_to_generation(self, generation: int):
+        """
+        cuts the store back to the births and evaluations of the generations before the given one, e.g., to match a
+        generation file that the run is restarting from.
+        :param generation: the first generation to drop
+        """
+        self.truncate(int(np.searchsorted(self.column("birth_generation"), generation)),
+                      int(np.searchsorted(self.column("generation"), generation)))
+
+    def _check_order(self, column: str, generation: int):
+        rows = self.column(column)
+        if len(rows) and generation < rows[-1]:
+            raise ValueError(f"The lineage store already holds generation {int(rows[-1])}, so it can't record "
+                             f"generation {generation}; cut it back with truncate_to_generation() first.")
+
+    def add_births(self, parents_a: Sequence[int], parents_b: Sequence[int], generation: int) -> np.ndarray:
+        """
+        records a batch of new feeders.
+        :param parents_a: the id of each one's first parent, or NO_PARENT for a founder
+        :param parents_b: the id of each one's second parent, or NO_PARENT if it had only one (or none)
+        :param generation: the generation in which they were first evaluated
+        :return: their new ids.
+        """
+        self._check_order("birth_generation", generation)
+        ids = np.arange(self.num_births, self.num_births + len(parents_a))
+        self._append(BIRTH_COLUMNS, {"parent_a": parents_a,
+                                     "parent_b": parents_b,
+                                     "birth_generation": np.full(len(ids), generation)})
+        self.num_births += len(ids)
+        return ids
+
+    def add_evaluations(self, feeder_ids: Sequence[int], generation: int, scores: Sequence[float]):
+        """
+        records the scores that some feeders earned in one generation.
+        :param feeder_ids: the feeders' ids
+        :param generation: the generation they were scored in
+        :param scores: their scores
+        """
+        self._check_order("generation", generation)
+        self._append(EVALUATION_COLUMNS, {"feeder_id": feeder_ids,
+                                          "generation": np.full(len(feeder_ids), generation),
+                                          "score": scores})
+        self.num_evaluations += len(feeder_ids)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        :param name: one of the names in BIRTH_COLUMNS or EVALUATION_COLUMNS
+        :return: a read-only memory map of the whole column.
+        """
+        dtype = BIRTH_COLUMNS.get(name, EVALUATION_COLUMNS.get(name))
+        rows = self.num_births if name in BIRTH_COLUMNS else self.num_evaluations
+        if name not in self._maps or len(self._maps[name]) != rows:
+            # memmap can't map an empty file.
+            self._maps[name] = np.memmap(self._path(name), dtype=dtype, mode="r", shape=(rows,)) if rows \
+                else np.zeros(0, dtype=dtype)
+        return self._maps[name]
+
+    def evaluations_in(self, generation: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param generation: a generation number
+        :return: the ids of the feeders scored in that generation, and their scores.
+        """
+        generations = self.column("generation")
+        start, end = np.searchsorted(generations, [generation, generation + 1])
+        return np.array(self.column("feeder_id")[start:end]), np.array(self.column("score")[start:end])
+
+    def ancestors(self, feeder_ids: Sequence[int]) -> np.ndarray:
+        """
+        :param feeder_ids: the feeders whose family tree to climb
+        :return: the sorted ids of all their ancestors - parents, grandparents and so on back to the founders.
+        """
+        parents_a, parents_b = self.column("parent_a"), self.column("parent_b")
+        is_ancestor = np.zeros(self.num_births, dtype=bool)
+        frontier = np.unique(np.asarray(feeder_ids, dtype=np.int64))
+        while len(frontier):
+            parents = np.concatenate((parents_a[frontier], parents_b[frontier]))
+            parents = np.unique(parents[parents != NO_PARENT])
+            frontier = parents[~is_ancestor[parents]]
+            is_ancestor[frontier] = True
+        return np.flatnonzero(is_ancestor)
+
+    def _children(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: the child index, built on first use: the ids of the children of feeder i are
+        children[offsets[i]:offsets[i + 1]].
+        """
+        if self._child_index is None or len(self._child_index[0]) != self.num_births + 1:
+            parents = np.concatenate((self.column("parent_a"), self.column("parent_b")))
+            children = np.concatenate((np.arange(self.num_births), np.arange(self.num_births)))
+            has_parent = parents != NO_PARENT
+            parents, children = parents[has_parent], children[has_parent]
+            order = np.argsort(parents, kind="stable")
+            offsets = np.zeros(self.num_births + 1, dtype=np.int64)
+            np.cumsum(np.bincount(parents, minlength=self.num_births), out=offsets[1:])
+            self._child_index = (offsets, children[order])
+        return self._child_index
+
+    def descendants(self, feeder_ids: Sequence[int]) -> np.ndarray:
+        """
+        :param feeder_ids: the feeders whose offspring to find
+        :return: the sorted ids of all their descendants - children, grandchildren and so on.
+        """
+        offsets, children = self._children()
+        is_descendant = np.zeros(self.num_births, dtype=bool)
+        frontier = np.unique(np.asarray(feeder_ids, dtype=np.int64))
+        while len(frontier):
+            # gather the children of every feeder in the frontier at once: a run of indices per feeder.
+            starts, counts = offsets[frontier], offsets[frontier + 1] - offsets[frontier]
+            run_starts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+            found = np.unique(children[run_starts + np.arange(counts.sum())])
+            frontier = found[~is_descendant[found]]
+            is_descendant[frontier] = True
+        return np.flatnonzero(is_descendant)
+
+    def founder_contributions(self, feeder_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        answers "which founders do these feeders descend from, and how much?", counting half of a feeder's genes as
+        coming from each of two parents, or all of them from a single parent.
+        :param feeder_ids: the feeders to trace, e.g., everyone evaluated in one generation
+        :return: the ids of the founders (feeders without parents) that contributed, and the share of the feeders' genes
+        that each contributed, largest share first. The shares add up to 1.
+        """
+        feeder_ids = np.asarray(feeder_ids, dtype=np.int64)
+        if len(feeder_ids) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        parents_a, parents_b = self.column("parent_a"), self.column("parent_b")
+        birth_generations = self.column("birth_generation")
+        share = np.zeros(self.num_births)
+        np.add.at(share, feeder_ids, 1 / len(feeder_ids))
+        # parents are born in earlier generations, so pushing the shares up one generation at a time, latest first,
+        # moves every share only after everything it receives from the feeder's children has arrived.
+        latest = int(birth_generations[feeder_ids].max())
+        earliest = int(birth_generations[0])
+        generation_starts = np.searchsorted(birth_generations, np.arange(earliest, latest + 2))
+        for start, end in reversed(list(zip(generation_starts[:-1].tolist(), generation_starts[1:].tolist()))):
+            passing = start + np.flatnonzero(share[start:end])
+            passing = passing[parents_a[passing] != NO_PARENT]
+            if len(passing) == 0:
+                continue
+            two_parents = parents_b[passing] != NO_PARENT
+            amounts = np.where(two_parents, share[passing] / 2, share[passing])
+            np.add.at(share, parents_a[passing], amounts)
+            np.add.at(share, parents_b[passing][two_parents], amounts[two_parents])
+            share[passing] = 0.0
+        founders = np.flatnonzero(share)
+        order = np.argsort(-share[founders], kind="stable")
+        return founders[order], share[founders][order]
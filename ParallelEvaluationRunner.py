@@ -0,0 +1,212 @@
+"""
+Evaluates each generation of a run on a pool of worker processes, passing the population and its results through
+shared memory (see SharedMemoryFile) rather than pickling feeders back and forth. The main process's BrainEngine keeps
+its gene matrix in the shared segment, so each new generation's genes are already there when it is bred; each worker
+simulates a slice of the population in its own copy of the scenario and writes each feeder's age, food level and cause
+of death straight into the shared result arrays, which the main process reads in place. All that crosses a pipe per
+generation is one small tuple per slice, and back, the causes of death that have no code.
+
+This is not the same as evaluating the population serially, in two ways:
+- A serial run carries its dangers and food over from one generation to the next. There is no one world to carry over
+  here, so each generation starts from a fresh scenario, drawn from the run number and the generation number (see
+  new_scenario()), and every slice starts from that same scenario.
+- Feeders affect each other through the food they eat, and each slice gets its own copy of the food, so feeders in
+  different slices don't compete for it.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import GeneticAlgorithmRunner
+from BrainFile import BrainArchitecture
+from DangerBallFile import DangerBall
+from FeederFile import DEFAULT_ARCHITECTURE, NUM_SENSORS, decode_name
+from FoodFile import Food
+from SharedMemoryFile import SharedArrays, DEATH_CODES, DEATH_REASONS, OTHER_DEATH_CODE, population_shapes
+from WorldConfigFile import WorldConfig, DEFAULT_WORLD
+
+EVALUATION_TIME_STEP = 0.1  # the number of simulated seconds per animation step in the workers.
+
+# the shared arrays and simulation of this worker process, set up once by start_worker().
+worker_arrays: Optional[SharedArrays] = None
+worker_runner: Optional[GeneticAlgorithmRunner.GeneticAlgorithmRunner] = None
+
+
+def start_worker(layout: dict, world: WorldConfig, architecture_description: str):
+    """
+    sets up a worker process: attaches to the shared arrays and builds the simulation that evaluates its slices.
+    :param layout: the layout of the shared arrays
+    :param world: the world to simulate
+    :param architecture_description: the feeders' brain architecture, as made by BrainArchitecture.describe()
+    """
+    global worker_arrays, worker_runner
+    GeneticAlgorithmRunner.TELEMETRY_PORT = None  # the main process reports on the run; workers must not try to.
+    worker_arrays = SharedArrays.attach(layout)
+    worker_runner = GeneticAlgorithmRunner.GeneticAlgorithmRunner(
+        world, BrainArchitecture.parse(architecture_description), show_windows=False)
+
+
+def evaluate_slice(job: Tuple[int, int, int]) -> Dict[int, str]:
+    """
+    simulates one generation of the feeders in rows start to end of the shared gene matrix, facing the shared scenario,
+    and writes their results into the same rows of the shared result arrays.
+    :param job: the first row, the row after the last one, and the seed for the random numbers
+    :return: the causes of death without a code in DEATH_CODES (e.g., new ones added to Feeder), by row; their rows
+    hold OTHER_DEATH_CODE.
+    """
+    start, end, seed = job
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    runner = worker_runner
+    runner.use_scenario(worker_arrays["danger_positions"], worker_arrays["danger_velocities"],
+                        worker_arrays["food_positions"].astype(int))
+    # the feeders are known by their rows here; their names only matter in the main process.
+    runner.reset_feeder_list(worker_arrays["genes"][start:end], [decode_name(row) for row in range(start, end)])
+    while runner.cycle_ongoing:
+        runner.age_of_cycle += EVALUATION_TIME_STEP
+        runner.simulate_step(EVALUATION_TIME_STEP)
+    feeders = runner.brain_engine.feeders
+    worker_arrays["ages"][start:end] = [bug.age for bug in feeders]
+    worker_arrays["food_levels"][start:end] = [bug.food_level for bug in feeders]
+    worker_arrays["death_codes"][start:end] = [DEATH_CODES.get(bug.death_reason, OTHER_DEATH_CODE) for bug in feeders]
+    return {row: bug.death_reason for row, bug in enumerate(feeders, start) if bug.death_reason not in DEATH_CODES}
+
+
+class ParallelEvaluator:
+    """
+    Owns the shared arrays and the pool of workers that evaluate generations through them. While it is open, the
+    runner's BrainEngine gathers its genes into the shared gene matrix. Use it as a context manager, so that the
+    workers are stopped, the engine is given back a gene matrix of its own and the shared memory is freed even if
+    something goes wrong.
+    """
+
+    def __init__(self, runner: GeneticAlgorithmRunner.GeneticAlgorithmRunner, num_workers: int):
+        """
+        :param runner: the run whose generations to evaluate; its world, population size and brain architecture fix
+        the size of the shared arrays
+        :param num_workers: the number of worker processes
+        """
+        self.runner = runner
+        self.num_workers = num_workers
+        self.other_death_reasons: Dict[int, str] = {}  # by row: the causes of death without a code, this generation.
+        world = runner.world
+        self.shared = SharedArrays.create(population_shapes(len(runner.feeder_list), runner.architecture.gene_length,
+                                                            world.num_food, world.num_moving_dangers))
+        self.brain_engine = runner.brain_engine
+        self.brain_engine.use_gene_buffer(self.shared["genes"])
+        self.pool = multiprocessing.Pool(processes=num_workers, initializer=start_worker,
+                                         initargs=(self.shared.layout, world, runner.architecture.describe()))
+
+    def __enter__(self) -> "ParallelEvaluator":
+        return self
+
+    def __exit__(self, *exception_info):
+        self.close()
+
+    def close(self):
+        """
+        stops the workers and frees the shared memory. Any result arrays from evaluate() must be gone by now.
+        """
+        self.pool.terminate()
+        self.pool.join()
+        if self.brain_engine.gene_buffer is self.shared["genes"]:
+            self.brain_engine.use_gene_buffer(None)
+        self.shared.close()
+        self.shared.unlink()
+
+    def evaluate(self, seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        lives out one generation of the runner's population on the workers, in the runner's current scenario.
+        :param seed: the seed for this generation's random numbers; each slice uses its own seed derived from it
+        :return: each feeder's age, food level and death code (see DEATH_CODES; for OTHER_DEATH_CODE, the cause of
+        death is in self.other_death_reasons), in the order of the runner's brain engine. These are views of the
+        shared arrays, valid until the next evaluation.
+        """
+        if self.runner.brain_engine.gene_buffer is not self.shared["genes"]:
+            raise ValueError("The runner's brain engine no longer keeps its genes in this evaluator's shared memory.")
+        self.shared["food_positions"][:] = [f.pos for f in self.runner.food_list]
+        self.shared["danger_positions"][:] = [db.pos for db in self.runner.moving_danger_list]
+        self.shared["danger_velocities"][:] = [db.velocity for db in self.runner.moving_danger_list]
+
+        num_feeders = len(self.shared["genes"])
+        bounds = np.linspace(0, num_feeders, min(num_feeders, 4 * self.num_workers) + 1).astype(int).tolist()
+        jobs = [(start, end, seed * 1000 + i) for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]))
+                if end > start]
+        self.other_death_reasons = {}
+        for reasons in self.pool.map(evaluate_slice, jobs):
+            self.other_death_reasons.update(reasons)
+        return self.shared["ages"], self.shared["food_levels"], self.shared["death_codes"]
+
+    def death_reason(self, row: int, death_code: int) -> str:
+        """
+        :param row: a feeder's row in the shared arrays
+        :param death_code: its death code, from evaluate()
+        :return: its death_reason.
+        """
+        if death_code == OTHER_DEATH_CODE:
+            return self.other_death_reasons[row]
+        return DEATH_REASONS[death_code]
+
+    def new_scenario(self, seed: int):
+        """
+        gives the runner a new random layout of moving dangers and food, drawn from the given seed, without disturbing
+        the random numbers that the rest of the run draws.
+        :param seed: the seed for the layout
+        """
+        world = self.runner.world
+        state = random.getstate()
+        random.seed(seed)
+        dangers = [DangerBall(world=world) for _ in range(world.num_moving_dangers)]
+        food = [Food(world=world) for _ in range(world.num_food)]
+        random.setstate(state)
+        self.runner.use_scenario(np.array([db.pos for db in dangers], dtype=float).reshape(-1, 2),
+                                 np.array([db.velocity for db in dangers], dtype=float).reshape(-1, 2),
+                                 np.array([f.pos for f in food], dtype=int).reshape(-1, 2))
+
+    def run(self, num_generations: int):
+        """
+        evolves the runner's population for num_generations more generations, evaluating each one on the workers in a
+        new scenario (see new_scenario()) and then breeding the next one as the runner always does.
+        :param num_generations: how many generations to run
+        """
+        runner = self.runner
+        for _ in range(num_generations):
+            seed = runner.program_run_number * 100000 + runner.generation_number
+            self.new_scenario(seed)
+            ages, food_levels, death_codes = self.evaluate(seed)
+            # the rest of the runner scores and ranks Feeder objects, so the results are handed to them here.
+            for row, bug in enumerate(runner.brain_engine.feeders):
+                bug.die(self.death_reason(row, int(death_codes[row])))
+                bug.age = float(ages[row])
+                bug.food_level = float(food_levels[row])
+            runner.leaderboard.reset(runner.brain_engine.feeders)
+            runner.cycle_ongoing = False
+            runner.handle_end_of_generation()
+            print(f"generation {runner.generation_number - 1}\tbest {runner.best_score_per_generation[-1]:3.2f}\t"
+                  f"mean {runner.mean_score_per_generation[-1]:3.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evolve feeders, evaluating each generation on worker processes.")
+    parser.add_argument("--feeders", type=int, default=DEFAULT_WORLD.num_feeders, help="number of feeders")
+    parser.add_argument("--generations", type=int, default=10, help="number of generations to run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--hidden", type=str, default="",
+                        help="comma-separated sizes of the brain's hidden layers, e.g. '8,8'; none by default")
+    parser.add_argument("--lineage", action="store_true",
+                        help="record every feeder's parents and scores in a lineage store, as an animated run does")
+    args = parser.parse_args()
+    GeneticAlgorithmRunner.RECORD_LINEAGE = args.lineage
+    architecture = DEFAULT_ARCHITECTURE
+    if args.hidden:
+        architecture = BrainArchitecture(num_inputs=2 * NUM_SENSORS,
+                                         hidden_layers=[int(size) for size in args.hidden.split(",")])
+    parallel_runner = GeneticAlgorithmRunner.GeneticAlgorithmRunner(WorldConfig(num_feeders=args.feeders),
+                                                                    architecture, show_windows=False)
+    with ParallelEvaluator(parallel_runner, args.workers) as evaluator:
+        evaluator.run(args.generations)
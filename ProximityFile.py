@@ -0,0 +1,130 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+MAX_PAIRS_PER_CHUNK = 1 << 20  # how many feeder-target distances to hold in memory at once while searching.
+
+
+def find_near_pairs(sources: np.ndarray, targets: np.ndarray, radius_squared: float) -> Tuple[np.ndarray, np.ndarray,
+                                                                                                np.ndarray]:
+    """
+    finds every (source, target) pair whose squared distance is at most radius_squared. The sources are processed in
+    chunks, so that memory stays bounded even for tens of thousands of sources and targets.
+    :param sources: an (N x 2) array of locations
+    :param targets: an (M x 2) array of locations
+    :param radius_squared: the largest squared distance to report
+    :return: three parallel arrays: the index of the source, the index of the target and their squared distance,
+    sorted by target, then source.
+    """
+    source_indices, target_indices, squared_distances = [], [], []
+    if len(sources) > 0 and len(targets) > 0:
+        chunk_size = max(1, MAX_PAIRS_PER_CHUNK // len(targets))
+        for start in range(0, len(sources), chunk_size):
+            chunk = sources[start:start + chunk_size]
+            dx = chunk[:, 0:1] - targets[:, 0]
+            dy = chunk[:, 1:2] - targets[:, 1]
+            chunk_squared = dx * dx + dy * dy
+            rows, cols = np.nonzero(chunk_squared <= radius_squared)
+            source_indices.append(rows + start)
+            target_indices.append(cols)
+            squared_distances.append(chunk_squared[rows, cols])
+    if not source_indices:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+    source_indices = np.concatenate(source_indices)
+    target_indices = np.concatenate(target_indices)
+    squared_distances = np.concatenate(squared_distances)
+    order = np.lexsort((source_indices, target_indices))
+    return source_indices[order], target_indices[order], squared_distances[order]
+
+
+class ProximityCache:
+    """
+    Remembers which feeders are near which targets (food or dangers), and how near, from one query to the next. A
+    query reuses every remembered distance whose feeder and target have not moved since, and only measures the rest:
+    new or moved feeders against every target, and the other feeders against the targets that moved.
+    Since feeders don't move between checking for contacts at the end of one animation step and sensing at the start
+    of the next, nearly all of the sensing is free: only dangers that moved, and food that was respawned, are measured
+    again.
+    """
+
+    def __init__(self, radius_squared: float):
+        """
+        :param radius_squared: pairs further apart than this (squared) are not remembered; this should be the largest
+        distance that any caller cares about.
+        """
+        self.radius_squared = radius_squared
+        self.feeder_indices: Optional[np.ndarray] = None
+        self.feeder_positions: Optional[np.ndarray] = None
+        self.target_positions: Optional[np.ndarray] = None
+        self.pairs: Tuple[np.ndarray, np.ndarray, np.ndarray] = (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                                                                 np.zeros(0))
+
+    def clear(self):
+        """
+        forget everything, e.g., when the population or the targets are replaced, since pairs are remembered by the
+        feeders' and targets' indices.
+        """
+        self.feeder_indices = None
+
+    def near_pairs(self, feeder_indices: np.ndarray, feeder_positions: np.ndarray,
+                   target_positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        finds every (feeder, target) pair within the radius of this cache.
+        :param feeder_indices: a sorted array of the ids (e.g., positions in the population) of the feeders to consider
+        :param feeder_positions: the (N x 2) locations of those feeders
+        :param target_positions: the (M x 2) locations of all the targets
+        :return: three parallel arrays: the feeder id, the index of the target and their squared distance, sorted by
+        target, then feeder.
+        """
+        changed = self._changes(feeder_indices, feeder_positions, target_positions)
+        if changed is None:
+            rows, cols, squared = find_near_pairs(feeder_positions, target_positions, self.radius_squared)
+            pairs = (feeder_indices[rows], cols, squared)
+        else:
+            changed_feeders, changed_targets = changed
+            # keep the remembered pairs for feeders that are still being considered and haven't moved, and targets
+            # that stayed put...
+            old_feeders, old_targets, old_squared = self.pairs
+            unchanged = np.zeros(int(max(feeder_indices.max(initial=0), old_feeders.max(initial=0))) + 1, dtype=bool)
+            unchanged[feeder_indices[~changed_feeders]] = True
+            keep = unchanged[old_feeders] & ~changed_targets[old_targets]
+
+            # ... measure the feeders that are new or moved against every target, and the rest against the targets
+            # that moved.
+            moved_feeders = np.flatnonzero(changed_feeders)
+            still_feeders = np.flatnonzero(~changed_feeders)
+            moved_targets = np.flatnonzero(changed_targets)
+            rows, cols, squared = find_near_pairs(feeder_positions[moved_feeders], target_positions,
+                                                  self.radius_squared)
+            still_rows, still_cols, still_squared = find_near_pairs(feeder_positions[still_feeders],
+                                                                    target_positions[moved_targets],
+                                                                    self.radius_squared)
+            feeders = np.concatenate((old_feeders[keep], feeder_indices[moved_feeders[rows]],
+                                      feeder_indices[still_feeders[still_rows]]))
+            targets = np.concatenate((old_targets[keep], cols, moved_targets[still_cols]))
+            squared = np.concatenate((old_squared[keep], squared, still_squared))
+            order = np.lexsort((feeders, targets))
+            pairs = (feeders[order], targets[order], squared[order])
+
+        self.feeder_indices = feeder_indices
+        self.feeder_positions = feeder_positions
+        self.target_positions = target_positions
+        self.pairs = pairs
+        return pairs
+
+    def _changes(self, feeder_indices: np.ndarray, feeder_positions: np.ndarray,
+                 target_positions: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        :return: boolean arrays marking the feeders that are new or have moved since the last query, and the targets
+        that have moved; or None if the remembered pairs can't be reused at all (nothing was remembered, or the number
+        of targets has changed).
+        """
+        if self.feeder_indices is None or len(target_positions) != len(self.target_positions):
+            return None
+        where = np.minimum(np.searchsorted(self.feeder_indices, feeder_indices), len(self.feeder_indices) - 1)
+        if len(self.feeder_indices) == 0:
+            changed_feeders = np.ones(len(feeder_indices), dtype=bool)
+        else:
+            changed_feeders = ((self.feeder_indices[where] != feeder_indices)
+                               | np.any(self.feeder_positions[where] != feeder_positions, axis=1))
+        return changed_feeders, np.any(target_positions != self.target_positions, axis=1)
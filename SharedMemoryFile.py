@@ -0,0 +1,87 @@
+from multiprocessing import shared_memory
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+# death_reason strings as small integers, for the shared per-feeder results. "" is a feeder that survived to the end.
+DEATH_CODES: Dict[str, int] = {"": 0, "E": 1, "O": 2}
+DEATH_REASONS = {code: reason for reason, code in DEATH_CODES.items()}
+OTHER_DEATH_CODE = -1  # any other death_reason; the reason itself has to travel some other way.
+ALIGNMENT = 64  # each array starts on a cache-line boundary within the segment.
+
+
+class SharedArrays:
+    """
+    A set of named NumPy arrays that live in one shared memory segment, so that several processes can read and write
+    them without copying or pickling anything. The process that creates them shares them by passing on self.layout - a
+    small dictionary naming the segment and where each array sits in it - which the others give to attach().
+
+    The creator should call unlink() once every process is done with the arrays; everyone should call close().
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, layout: Dict[str, Any], owner: bool):
+        self.memory = memory
+        self.layout = layout
+        self.owner = owner
+        self.arrays: Dict[str, np.ndarray] = {
+            name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+            for name, (offset, shape, dtype) in layout["arrays"].items()}
+
+    @staticmethod
+    def create(shapes: Dict[str, Tuple[Tuple[int, ...], Any]]) -> "SharedArrays":
+        """
+        allocates zero-filled arrays in a new shared memory segment.
+        :param shapes: the (shape, dtype) of each array, by name
+        :return: the arrays.
+        """
+        arrays: Dict[str, Tuple[int, Tuple[int, ...], str]] = {}
+        size = 0
+        for name, (shape, dtype) in shapes.items():
+            dtype = np.dtype(dtype)
+            arrays[name] = (size, tuple(shape), dtype.str)
+            num_bytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            size += (num_bytes + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shared = SharedArrays(memory, {"segment": memory.name, "arrays": arrays}, owner=True)
+        for array in shared.arrays.values():
+            array.fill(0)
+        return shared
+
+    @staticmethod
+    def attach(layout: Dict[str, Any]) -> "SharedArrays":
+        """
+        :param layout: the layout of arrays made by create() in another process
+        :return: the same arrays, seen from this process.
+        """
+        return SharedArrays(shared_memory.SharedMemory(name=layout["segment"]), layout, owner=False)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def close(self):
+        """
+        stops using the arrays in this process. Any views of them must be gone by now.
+        """
+        self.arrays.clear()
+        self.memory.close()
+
+    def unlink(self):
+        """
+        frees the segment, once every process has closed it (only the creator should call this).
+        """
+        self.memory.unlink()
+
+
+def population_shapes(num_feeders: int, gene_length: int, num_food: int,
+                      num_dangers: int) -> Dict[str, Tuple[Tuple[int, ...], Any]]:
+    """
+    :return: the arrays that a population's evaluation shares between processes: the gene matrix, the scenario that
+    every feeder faces, and a row of results per feeder.
+    """
+    return {"genes": ((num_feeders, gene_length), np.float64),
+            "food_positions": ((num_food, 2), np.float64),
+            "danger_positions": ((num_dangers, 2), np.float64),
+            "danger_velocities": ((num_dangers, 2), np.float64),
+            "ages": ((num_feeders,), np.float64),
+            "food_levels": ((num_feeders,), np.float64),
+            "death_codes": ((num_feeders,), np.int8)}
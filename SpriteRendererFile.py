@@ -0,0 +1,187 @@
+import math
+from typing import Callable, List, Sequence
+
+import cv2
+import numpy as np
+
+from DangerBallFile import DANGERBALL_RADIUS
+from FeederFile import Feeder, FEEDER_RADIUS
+from FoodFile import FOOD_RADIUS
+from WorldConfigFile import WorldConfig
+
+NUM_ORIENTATION_BUCKETS = 32  # how many pre-drawn orientations of the feeders' direction line.
+HEALTH_BAR_LENGTH_PER_FOOD = 0.3  # pixels of health bar per unit of food_level, as in Feeder.draw_self.
+MAX_HEALTH_BAR_LENGTH = 30  # the longest health bar to pre-draw, in pixels (a well-fed feeder has 100 food).
+
+FOOD_COLOR = (0, 0.5, 0.25)
+DANGER_COLOR = (0, 0, 0)
+HEALTHY_COLOR = (0, 1, 0)
+HUNGRY_COLOR = (0, 0, 1)  # the health bar's color when food_level is below 20.
+
+
+class Sprite:
+    """
+    A shape drawn once with OpenCV, remembered as the pixels it covers relative to its center. Each pixel also has a
+    label saying which color of a palette it takes, so a shape made of several colors (a feeder's body, outline and
+    direction line) can be stamped with one assignment.
+    """
+
+    def __init__(self, size: int, draw: Callable[[np.ndarray, int], None]):
+        """
+        :param size: the largest distance from the center that the shape reaches, in pixels
+        :param draw: a function that draws the shape on the single-channel uint8 image it is given, centered at
+        (size, size). Pixels drawn with value v take color v-1 of the palette; later strokes cover earlier ones.
+        """
+        image = np.zeros((2 * size + 1, 2 * size + 1), dtype=np.uint8)
+        draw(image, size)
+        dy, dx = np.nonzero(image)
+        self.dy = dy - size
+        self.dx = dx - size
+        self.labels = image[dy, dx].astype(int) - 1
+        self.reach = int(max(np.abs(self.dy).max(initial=0), np.abs(self.dx).max(initial=0)))
+
+
+def pixel_view(canvas: np.ndarray) -> np.ndarray:
+    """
+    :param canvas: an (H x W x channels) C-contiguous canvas
+    :return: a flat view of the canvas with one element per pixel, so a whole pixel can be written as one scalar.
+    """
+    if not canvas.flags.c_contiguous:
+        raise ValueError("Sprites can only be stamped onto a contiguous canvas.")
+    return canvas.reshape(-1, canvas.shape[2]).view(np.dtype((np.void, canvas.itemsize * canvas.shape[2])))[:, 0]
+
+
+def as_pixels(colors: np.ndarray, canvas: np.ndarray) -> np.ndarray:
+    """
+    :param colors: an array of colors, with the channels last
+    :param canvas: the canvas they are for
+    :return: the colors as the canvas' pixel scalars (see pixel_view), in an array one dimension smaller.
+    """
+    colors = np.ascontiguousarray(colors, dtype=canvas.dtype)
+    return colors.view(np.dtype((np.void, canvas.itemsize * canvas.shape[2])))[..., 0]
+
+
+def stamp(canvas: np.ndarray, centers: np.ndarray, sprite: Sprite, palettes: np.ndarray):
+    """
+    copies a sprite onto the canvas at many places at once.
+    :param canvas: the (H x W x 3) canvas
+    :param centers: an (N x 2) array of the (x, y) pixel locations of the sprites
+    :param sprite: the sprite to stamp
+    :param palettes: the sprite's colors - a (P x 3) palette for all the copies, or (N x P x 3), one per copy
+    """
+    if len(centers) == 0 or len(sprite.labels) == 0:
+        return
+    height, width = canvas.shape[:2]
+    pixels = pixel_view(canvas)
+    colors = as_pixels(palettes, canvas)[..., sprite.labels]
+    per_copy = colors.ndim == 2
+
+    # copies that lie wholly on the canvas need no clipping: each pixel is a fixed offset from the center's pixel.
+    inside = ((centers[:, 0] >= sprite.reach) & (centers[:, 0] < width - sprite.reach)
+              & (centers[:, 1] >= sprite.reach) & (centers[:, 1] < height - sprite.reach))
+    middles = centers[inside, 1] * width + centers[inside, 0]
+    pixels[middles[:, None] + (sprite.dy * width + sprite.dx)] = colors[inside] if per_copy else colors
+
+    if not inside.all():
+        ys = centers[~inside, 1:2] + sprite.dy
+        xs = centers[~inside, 0:1] + sprite.dx
+        visible = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+        edge_colors = colors[~inside] if per_copy else np.broadcast_to(colors, ys.shape)
+        pixels[ys[visible] * width + xs[visible]] = edge_colors[visible]
+
+
+class SpriteRenderer:
+    """
+    Draws the food, dangers and feeders of the simulation window by stamping pre-drawn sprites, so the cost of a frame
+    is a few array assignments per kind of thing rather than a few OpenCV calls per thing. Feeders are pre-drawn in
+    NUM_ORIENTATION_BUCKETS orientations. Their names and health bars are an optional extra layer; names still take one
+    OpenCV call per feeder, so they are worth turning off for large populations.
+    """
+
+    def __init__(self, world: WorldConfig):
+        self.world = world
+        food_radius = world.scale_length(FOOD_RADIUS)
+        danger_radius = world.scale_length(DANGERBALL_RADIUS)
+        feeder_radius = world.scale_length(FEEDER_RADIUS)
+
+        self.food_sprite = Sprite(food_radius, lambda image, c: cv2.circle(image, (c, c), food_radius, 1,
+                                                                           thickness=-1))
+        self.danger_sprite = Sprite(danger_radius + 1, lambda image, c: cv2.circle(image, (c, c), danger_radius, 1,
+                                                                                   thickness=1))
+        # a feeder is its body (color 0 of its palette), under a thick white line (1) and a thin black one (2) from
+        # its center to its front.
+        self.feeder_sprites: List[Sprite] = []
+        for bucket in range(NUM_ORIENTATION_BUCKETS):
+            angle = bucket * 2 * math.pi / NUM_ORIENTATION_BUCKETS
+
+            def draw_feeder(image: np.ndarray, c: int):
+                front = (int(c + feeder_radius * math.cos(angle)), int(c + feeder_radius * math.sin(angle)))
+                cv2.circle(image, (c, c), feeder_radius, 1, thickness=-1)
+                cv2.line(image, (c, c), front, 2, thickness=3)
+                cv2.line(image, (c, c), front, 3, thickness=1)
+
+            self.feeder_sprites.append(Sprite(feeder_radius + 2, draw_feeder))
+        # a health bar of every length, each starting at the sprite's center.
+        self.health_bar_sprites = [Sprite(MAX_HEALTH_BAR_LENGTH + 1, lambda image, c, length=length: cv2.line(
+            image, (c, c), (c + length, c), 1, thickness=2)) for length in range(MAX_HEALTH_BAR_LENGTH + 1)]
+
+    def screen_positions(self, positions: Sequence[Sequence[float]]) -> np.ndarray:
+        """
+        :param positions: locations in world coordinates
+        :return: an (N x 2) array of the matching pixel locations, just as WorldConfig.to_screen would give them.
+        """
+        positions = np.array(positions, dtype=float).reshape(-1, 2)
+        return ((positions - self.world.view_origin) * self.world.zoom).astype(int)
+
+    def draw_food(self, canvas: np.ndarray, positions: Sequence[Sequence[float]]):
+        """
+        :param canvas: the simulation window
+        :param positions: the locations of all the food
+        """
+        stamp(canvas, self.screen_positions(positions), self.food_sprite, np.array([FOOD_COLOR]))
+
+    def draw_dangers(self, canvas: np.ndarray, positions: Sequence[Sequence[float]]):
+        """
+        :param canvas: the simulation window
+        :param positions: the locations of the dangers to draw
+        """
+        stamp(canvas, self.screen_positions(positions), self.danger_sprite, np.array([DANGER_COLOR]))
+
+    def draw_feeders(self, canvas: np.ndarray, feeders: Sequence[Feeder], show_labels: bool = True):
+        """
+        :param canvas: the simulation window
+        :param feeders: the feeders to draw
+        :param show_labels: whether to add each feeder's name and health bar
+        """
+        if len(feeders) == 0:
+            return
+        centers = self.screen_positions([bug.position for bug in feeders])
+        palettes = np.empty((len(feeders), 3, 3))
+        palettes[:, 0] = [bug.color for bug in feeders]
+        palettes[:, 1] = (1.0, 1.0, 1.0)
+        palettes[:, 2] = (0.0, 0.0, 0.0)
+        orientations = np.array([bug.orientation for bug in feeders])
+        buckets = np.round(orientations / (2 * math.pi) * NUM_ORIENTATION_BUCKETS).astype(int) % NUM_ORIENTATION_BUCKETS
+        for bucket in np.unique(buckets).tolist():
+            in_bucket = buckets == bucket
+            stamp(canvas, centers[in_bucket], self.feeder_sprites[bucket], palettes[in_bucket])
+
+        if show_labels:
+            self.draw_health_bars(canvas, centers, np.array([bug.food_level for bug in feeders]))
+            for bug, center in zip(feeders, centers.tolist()):
+                cv2.putText(img=canvas, text=bug.name, org=(center[0] - 20, center[1] - 15),
+                            fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=0.75, color=bug.color)
+
+    def draw_health_bars(self, canvas: np.ndarray, centers: np.ndarray, food_levels: np.ndarray):
+        """
+        draws every feeder's health bar above and to the left of it.
+        :param canvas: the simulation window
+        :param centers: the (N x 2) pixel locations of the feeders
+        :param food_levels: the food_level of each feeder
+        """
+        lengths = np.clip((HEALTH_BAR_LENGTH_PER_FOOD * food_levels).astype(int), 0, MAX_HEALTH_BAR_LENGTH)
+        starts = centers + np.array([-20, -14])
+        palettes = np.where((food_levels < 20)[:, None, None], np.array([[HUNGRY_COLOR]]), np.array([[HEALTHY_COLOR]]))
+        for length in np.unique(lengths).tolist():
+            same_length = lengths == length
+            stamp(canvas, starts[same_length], self.health_bar_sprites[length], palettes[same_length])
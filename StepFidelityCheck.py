@@ -0,0 +1,163 @@
+"""
+Compares adaptive stepping against a fine fixed-step reference, and against plain coarse steps, on the same world and
+population, for one generation. For each way of stepping it reports how long the generation took, how many feeder-steps
+were actually simulated, how far the feeders ended up from where the reference put them, how many of them met the same
+fate (starved, hit a danger or survived) at exactly the same age, and how many ended with a different age or score.
+It also checks the runner's batched sensing against Feeder.detect(), the one-feeder-at-a-time reference.
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+import GeneticAlgorithmRunner
+from WorldConfigFile import WorldConfig, DEFAULT_WORLD
+
+
+def run_generation(world: WorldConfig, seed: int, delta_t: float, adaptive: bool,
+                   sample_interval: float) -> Dict[str, Any]:
+    """
+    simulates the first generation of a world, without drawing.
+    :param world: the world to simulate
+    :param seed: the seed for the random numbers, so every run sees the same feeders, dangers and food
+    :param delta_t: the number of seconds per animation step
+    :param adaptive: whether to use adaptive stepping
+    :param sample_interval: the number of seconds between snapshots of the feeders' locations
+    :return: the locations of the feeders at each snapshot (NaN for the dead), their ages, causes of death and scores
+    at the end, the wall time taken and the number of feeder-steps simulated.
+    """
+    GeneticAlgorithmRunner.ADAPTIVE_STEPPING = adaptive
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    runner = GeneticAlgorithmRunner.GeneticAlgorithmRunner(world, show_windows=False)
+    population = runner.brain_engine.feeders
+    steps_per_sample = max(1, round(sample_interval / delta_t))
+    snapshots = []
+    feeder_steps = 0
+    start = time.perf_counter()
+    while runner.cycle_ongoing:
+        runner.age_of_cycle += delta_t
+        runner.simulate_step(delta_t)
+        feeder_steps += runner.leaderboard.live_count - int(runner.coast_schedule.coasting.sum())
+        if runner.coast_schedule.step % steps_per_sample == 0:
+            runner.record_deaths(runner.coast_schedule.settle_all(population, runner.coast_schedule.step))
+            snapshots.append([bug.position if bug.is_alive else [np.nan, np.nan] for bug in population])
+    wall_seconds = time.perf_counter() - start
+    return {"snapshots": np.array(snapshots, dtype=float),
+            "ages": np.array([bug.age for bug in population]),
+            "death_reasons": [bug.death_reason for bug in population],
+            "scores": np.array([runner.score_of(bug) for bug in population]),
+            "wall_seconds": wall_seconds,
+            "feeder_steps": feeder_steps}
+
+
+def compare(result: Dict[str, Any], reference: Dict[str, Any]) -> Dict[str, float]:
+    """
+    :param result: what run_generation() returned for some way of stepping
+    :param reference: what it returned for the reference
+    :return: measures of how closely the result follows the reference.
+    """
+    num_samples = min(len(result["snapshots"]), len(reference["snapshots"]))
+    errors = np.linalg.norm(result["snapshots"][:num_samples] - reference["snapshots"][:num_samples], axis=2)
+    same_age = result["ages"] == reference["ages"]
+    same_fate = (np.array(result["death_reasons"]) == np.array(reference["death_reasons"])) & same_age
+    return {"mean_position_error": float(np.nanmean(errors)) if np.isfinite(errors).any() else 0.0,
+            "max_position_error": float(np.nanmax(errors)) if np.isfinite(errors).any() else 0.0,
+            "same_fate": float(same_fate.mean()),
+            "ages_differing": int((~same_age).sum()),
+            "scores_differing": int((result["scores"] != reference["scores"]).sum()),
+            "mean_age_error": float(np.abs(result["ages"] - reference["ages"]).mean())}
+
+
+def check_sensing(world: WorldConfig, seed: int, delta_t: float, num_checks: int):
+    """
+    simulates the first generation of a world with fixed steps, and every so often compares the sensor readings of the
+    runner's batched sensing with those that Feeder.detect() gives each live feeder for every food item and danger.
+    Prints how many readings differed, and by how much at most.
+    :param world: the world to simulate
+    :param seed: the seed for the random numbers
+    :param delta_t: the number of seconds per animation step
+    :param num_checks: how many times to compare the readings
+    """
+    GeneticAlgorithmRunner.ADAPTIVE_STEPPING = False
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    runner = GeneticAlgorithmRunner.GeneticAlgorithmRunner(world, show_windows=False)
+    engine = runner.brain_engine
+    steps_per_check = max(1, round(GeneticAlgorithmRunner.MAX_CYCLE_DURATION / delta_t / num_checks))
+    readings, differing, largest_difference = 0, 0, 0.0
+    step = 0
+    while runner.cycle_ongoing:
+        runner.age_of_cycle += delta_t
+        runner.simulate_step(delta_t)
+        step += 1
+        if step % steps_per_check or not runner.cycle_ongoing:
+            continue
+        runner.clear_all_live_feeder_sensors()
+        runner.detect_all_food_and_dangers()
+        batched = engine.sensors.copy()
+        engine.clear_sensors()
+        live = [i for i, bug in enumerate(engine.feeders) if bug.is_alive]
+        for i in live:
+            bug = engine.feeders[i]
+            for f in runner.food_list:
+                bug.detect(f.pos)
+            for db in runner.all_dangers:
+                bug.detect(db.pos, isDanger=True)
+        differences = np.abs(batched[live] - engine.sensors[live])
+        readings += differences.size
+        differing += int(np.count_nonzero(differences))
+        largest_difference = max(largest_difference, float(differences.max(initial=0.0)))
+    print(f"sensing: {differing} of {readings} readings differ from Feeder.detect(), by at most "
+          f"{largest_difference:g}")
+
+
+def check_fidelity(world: WorldConfig, seed: int, fine_step: float, coarse_factor: int, sample_interval: float):
+    """
+    runs the reference (fine fixed steps), adaptive stepping with the same fine steps, and fixed steps coarse_factor
+    times longer, and prints how each compares to the reference.
+    :param world: the world to simulate
+    :param seed: the seed for the random numbers
+    :param fine_step: the length of the reference's steps, in seconds
+    :param coarse_factor: how many fine steps make one coarse step
+    :param sample_interval: the number of seconds between comparisons of the feeders' locations; a multiple of the
+    coarse step
+    """
+    reference = run_generation(world, seed, fine_step, False, sample_interval)
+    runs = {f"fixed {fine_step:g} s (reference)": reference,
+            f"adaptive {fine_step:g} s": run_generation(world, seed, fine_step, True, sample_interval),
+            f"fixed {fine_step * coarse_factor:g} s": run_generation(world, seed, fine_step * coarse_factor, False,
+                                                                     sample_interval)}
+    print(f"{'stepping':<28}{'wall s':>8}{'feeder-steps':>14}{'mean err':>10}{'max err':>10}{'same fate':>11}"
+          f"{'ages differ':>13}{'scores differ':>15}{'age err':>9}")
+    for name, result in runs.items():
+        measures = compare(result, reference)
+        print(f"{name:<28}{result['wall_seconds']:>8.2f}{result['feeder_steps']:>14}"
+              f"{measures['mean_position_error']:>10.2f}{measures['max_position_error']:>10.2f}"
+              f"{measures['same_fate']:>11.1%}{measures['ages_differing']:>13}{measures['scores_differing']:>15}"
+              f"{measures['mean_age_error']:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare adaptive stepping with fine and coarse fixed steps.")
+    parser.add_argument("--width", type=int, default=DEFAULT_WORLD.width, help="width of the arena")
+    parser.add_argument("--height", type=int, default=DEFAULT_WORLD.height, help="height of the arena")
+    parser.add_argument("--feeders", type=int, default=DEFAULT_WORLD.num_feeders, help="number of feeders")
+    parser.add_argument("--food", type=int, default=DEFAULT_WORLD.num_food, help="number of food items")
+    parser.add_argument("--dangers", type=int, default=DEFAULT_WORLD.num_moving_dangers,
+                        help="number of moving dangers")
+    parser.add_argument("--seed", type=int, default=1, help="the seed for the random numbers")
+    parser.add_argument("--step", type=float, default=0.05, help="the fine time step, in seconds")
+    parser.add_argument("--coarse-factor", type=int, default=10, help="how many fine steps make one coarse step")
+    parser.add_argument("--sample-interval", type=float, default=1.0,
+                        help="seconds between comparisons of the feeders' locations")
+    args = parser.parse_args()
+    check_fidelity(WorldConfig(width=args.width, height=args.height, num_feeders=args.feeders, num_food=args.food,
+                               num_moving_dangers=args.dangers),
+                   args.seed, args.step, args.coarse_factor, args.sample_interval)
+    check_sensing(WorldConfig(width=args.width, height=args.height, num_feeders=args.feeders, num_food=args.food,
+                              num_moving_dangers=args.dangers),
+                  args.seed, args.step, num_checks=5)
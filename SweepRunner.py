@@ -0,0 +1,229 @@
+"""
+Runs many headless simulations with different settings on a pool of worker processes, and collects their results in
+one table. A sweep is described by a JSON file, e.g.:
+
+    {"mode": "grid",
+     "parameters": {"num_food": [100, 200, 400], "MAX_CYCLE_DURATION": [30, 60]},
+     "generations": 20, "time_step": 0.1, "repeats": 2, "seed": 1}
+
+or, for a random search, "mode": "random" with "samples": 50, where each parameter is either a list to pick from or
+{"min": ..., "max": ...} to draw uniformly from (integers if both ends are integers).
+
+Parameters named like WorldConfig's arguments (width, height, num_feeders, num_food, num_moving_dangers) set up the
+world; any other parameter must be an UPPER_CASE constant of the simulation modules (e.g., MAX_CYCLE_DURATION, or
+MAX_SPEED in FeederFile), and is set in every module that has it. Constants computed from other constants when a
+module is loaded (e.g., FOOD_SENSOR_RADIUS_SQUARED) are not recomputed, so sweep those directly.
+
+Runs whose worlds have the same size and numbers of food and dangers share one scenario - the same starting dangers
+and food - so that their results can be compared fairly; it is generated once and read by each worker.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+import DangerBallFile
+import FeederFile
+import FoodFile
+import GeneticAlgorithmRunner
+from CheckpointFile import write_checkpoint, read_checkpoint
+from DangerBallFile import DangerBall
+from FoodFile import Food
+from WorldConfigFile import WorldConfig
+
+WORLD_PARAMETERS = ("width", "height", "num_feeders", "num_food", "num_moving_dangers")
+SIMULATION_MODULES = (GeneticAlgorithmRunner, FeederFile, DangerBallFile, FoodFile)
+RESULT_COLUMNS = ["run_id", "repeat", "seed", "generations", "final_best_score", "final_mean_score",
+                  "best_score_ever", "generations_per_second", "wall_seconds", "error"]
+
+
+def expand_spec(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    lists the settings of every run described by a sweep spec.
+    :param spec: the sweep spec, as read from its JSON file
+    :return: one dictionary of parameter values per configuration (not counting repeats).
+    """
+    parameters: Dict[str, Any] = spec["parameters"]
+    names = sorted(parameters)
+    if spec.get("mode", "grid") == "grid":
+        for name in names:
+            if not isinstance(parameters[name], list):
+                raise ValueError(f"In a grid sweep, parameter {name} must be a list of values.")
+        return [dict(zip(names, values)) for values in itertools.product(*(parameters[name] for name in names))]
+
+    chooser = random.Random(spec.get("seed", 0))
+    configurations = []
+    for _ in range(spec["samples"]):
+        configuration = {}
+        for name in names:
+            choices = parameters[name]
+            if isinstance(choices, list):
+                configuration[name] = chooser.choice(choices)
+            elif isinstance(choices["min"], int) and isinstance(choices["max"], int):
+                configuration[name] = chooser.randint(choices["min"], choices["max"])
+            else:
+                configuration[name] = chooser.uniform(choices["min"], choices["max"])
+        configurations.append(configuration)
+    return configurations
+
+
+def check_parameter_names(configuration: Dict[str, Any]):
+    """
+    makes sure that every parameter is something a run can actually set, so a typo fails before any run starts.
+    :param configuration: one run's parameter values
+    """
+    for name in configuration:
+        if name not in WORLD_PARAMETERS and not any(name.isupper() and hasattr(module, name)
+                                                    for module in SIMULATION_MODULES):
+            raise ValueError(f"'{name}' is neither a world parameter {WORLD_PARAMETERS} nor a constant of "
+                             f"{[module.__name__ for module in SIMULATION_MODULES]}.")
+
+
+def world_for(configuration: Dict[str, Any]) -> WorldConfig:
+    """
+    :param configuration: one run's parameter values
+    :return: the world those values describe (anything not given keeps its default).
+    """
+    return WorldConfig(**{name: value for name, value in configuration.items() if name in WORLD_PARAMETERS})
+
+
+def scenario_key(world: WorldConfig) -> Tuple[int, int, int, int]:
+    """
+    :return: what a scenario depends on; runs whose worlds have the same key can share a scenario.
+    """
+    return world.width, world.height, world.num_food, world.num_moving_dangers
+
+
+def make_scenario(world: WorldConfig, seed: int, filename: str):
+    """
+    generates the starting dangers and food for a world and writes them to a file.
+    :param world: the world to fill
+    :param seed: the seed for the random layout
+    :param filename: the file to write
+    """
+    state = random.getstate()
+    random.seed(seed)
+    dangers = [DangerBall(world=world) for _ in range(world.num_moving_dangers)]
+    food = [Food(world=world) for _ in range(world.num_food)]
+    random.setstate(state)
+    write_checkpoint(filename, {
+        "danger_positions": np.array([db.pos for db in dangers], dtype=float).reshape(-1, 2),
+        "danger_velocities": np.array([db.velocity for db in dangers], dtype=float).reshape(-1, 2),
+        "food_positions": np.array([f.pos for f in food], dtype=int).reshape(-1, 2)})
+
+
+def run_one(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    runs one configuration in this (worker) process. This never raises; a failure is reported in the "error" column.
+    :param job: the run's id, repeat number, seed, parameters, scenario file, number of generations and time step
+    :return: one row of the results table.
+    """
+    row: Dict[str, Any] = {"run_id": job["run_id"], "repeat": job["repeat"], "seed": job["seed"],
+                           "generations": job["generations"], **job["parameters"]}
+    try:
+        # sweeps only keep the results table, so runs don't leave lineage stores behind unless a sweep asks for them.
+        GeneticAlgorithmRunner.RECORD_LINEAGE = False
+        for name, value in job["parameters"].items():
+            if name not in WORLD_PARAMETERS:
+                for module in SIMULATION_MODULES:
+                    if hasattr(module, name):
+                        setattr(module, name, value)
+        random.seed(job["seed"])
+        np.random.seed(job["seed"] % 2 ** 32)
+
+        start = time.perf_counter()
+        runner = GeneticAlgorithmRunner.GeneticAlgorithmRunner(world_for(job["parameters"]), show_windows=False)
+        scenario = read_checkpoint(job["scenario_filename"])
+        runner.use_scenario(scenario["danger_positions"], scenario["danger_velocities"], scenario["food_positions"])
+        runner.run_headless(job["generations"], job["time_step"])
+        wall_seconds = time.perf_counter() - start
+
+        row.update(final_best_score=runner.best_score_per_generation[-1],
+                   final_mean_score=runner.mean_score_per_generation[-1],
+                   best_score_ever=max(runner.best_score_per_generation),
+                   generations_per_second=job["generations"] / wall_seconds,
+                   wall_seconds=wall_seconds,
+                   error="")
+    except Exception:
+        row["error"] = traceback.format_exc(limit=3).strip().replace("\n", " | ")
+    return row
+
+
+class SweepRunner:
+
+    def __init__(self, spec: Dict[str, Any], output_filename: str, num_workers: int):
+        """
+        :param spec: the sweep spec, as read from its JSON file
+        :param output_filename: the CSV file in which to collect the results
+        :param num_workers: the most simulations to run at once
+        """
+        self.spec = spec
+        self.output_filename = output_filename
+        self.num_workers = num_workers
+        self.scenario_directory = f"{os.path.splitext(output_filename)[0]}-scenarios"
+
+    def make_jobs(self) -> List[Dict[str, Any]]:
+        """
+        lists every run of the sweep, generating the scenarios they need (one per distinct world).
+        :return: one job per run, for run_one().
+        """
+        configurations = expand_spec(self.spec)
+        base_seed = self.spec.get("seed", 0)
+        os.makedirs(self.scenario_directory, exist_ok=True)
+        scenario_filenames: Dict[Tuple[int, int, int, int], str] = {}
+        jobs = []
+        for run_id, configuration in enumerate(configurations):
+            check_parameter_names(configuration)
+            world = world_for(configuration)
+            key = scenario_key(world)
+            if key not in scenario_filenames:
+                scenario_filenames[key] = os.path.join(self.scenario_directory,
+                                                       f"scenario-{'-'.join(str(value) for value in key)}.npz")
+                make_scenario(world, base_seed, scenario_filenames[key])
+            for repeat in range(self.spec.get("repeats", 1)):
+                jobs.append({"run_id": run_id,
+                             "repeat": repeat,
+                             "seed": base_seed + 1000 * run_id + repeat,
+                             "parameters": configuration,
+                             "scenario_filename": scenario_filenames[key],
+                             "generations": self.spec.get("generations", 10),
+                             "time_step": self.spec.get("time_step", 0.1)})
+        return jobs
+
+    def run(self):
+        """
+        runs every job on a pool of worker processes, writing each result to the table as soon as it is in.
+        """
+        jobs = self.make_jobs()
+        parameter_names = sorted({name for job in jobs for name in job["parameters"]})
+        print(f"Running {len(jobs)} simulations on {self.num_workers} workers; results go to {self.output_filename}.")
+        # each worker process only runs one job, so the constants set for one run never leak into the next.
+        with multiprocessing.Pool(processes=self.num_workers, maxtasksperchild=1) as pool, \
+                open(self.output_filename, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=RESULT_COLUMNS[:3] + parameter_names + RESULT_COLUMNS[3:])
+            writer.writeheader()
+            for finished, row in enumerate(pool.imap_unordered(run_one, jobs), start=1):
+                writer.writerow(row)
+                file.flush()
+                outcome = f"failed: {row['error']}" if row["error"] else f"best {row['final_best_score']:3.2f}"
+                print(f"{finished}/{len(jobs)}\trun {row['run_id']} repeat {row['repeat']}\t{outcome}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a sweep of headless feeder simulations.")
+    parser.add_argument("spec", help="the JSON file describing the sweep")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="the most simulations to run at once")
+    parser.add_argument("--output", default="sweep results.csv", help="the CSV file in which to collect the results")
+    args = parser.parse_args()
+    with open(args.spec, "r") as spec_file:
+        sweep_spec = json.load(spec_file)
+    SweepRunner(sweep_spec, args.output, args.workers).run()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+TELEMETRY_HOST = "127.0.0.1"  # only local clients (or an SSH tunnel) can reach the telemetry server.
+TIMING_WINDOW_STEPS = 100  # the number of animation steps over which the step rate and phase timings are averaged.
+COMMANDS = ("save", "stop")  # "save": write a checkpoint now; "stop": stop once this generation is over.
+
+
+class PhaseTimer:
+    """
+    Measures how long each phase of an animation step takes, averaged over windows of TIMING_WINDOW_STEPS steps. The
+    simulation calls lap() after each phase and end_step() after each step; that costs a clock reading and a dictionary
+    update per phase.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.steps = 0
+        self.window_start = time.perf_counter()
+        self.last_lap = self.window_start
+        self.steps_per_second = 0.0
+        self.phase_milliseconds: Dict[str, float] = {}  # the average of each phase, per step, over the last window.
+
+    def start_step(self):
+        """
+        starts timing a step; its first phase begins now.
+        """
+        self.last_lap = time.perf_counter()
+
+    def lap(self, phase: str):
+        """
+        charges the time since the previous lap (or the start of the step) to the given phase.
+        :param phase: the name of the phase that just finished
+        """
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + now - self.last_lap
+        self.last_lap = now
+
+    def end_step(self) -> bool:
+        """
+        :return: whether this step completed a window, so that steps_per_second and phase_milliseconds are new.
+        """
+        self.steps += 1
+        if self.steps < TIMING_WINDOW_STEPS:
+            return False
+        now = time.perf_counter()
+        self.steps_per_second = self.steps / max(now - self.window_start, 1e-9)
+        self.phase_milliseconds = {phase: 1000 * total / self.steps for phase, total in self.totals.items()}
+        self.totals = {}
+        self.steps = 0
+        self.window_start = now
+        return True
+
+
+class TelemetryServer:
+    """
+    A small HTTP server, running on its own thread, that reports on a run and takes commands for it:
+
+        GET  /               the latest status, as JSON
+        POST /command/save   write a checkpoint now
+        POST /command/stop   stop once the current generation is over
+
+    The simulation never waits for it: it publishes new status by replacing a dictionary (which the server only
+    reads), and collects commands with pending_commands() whenever it likes.
+    """
+
+    def __init__(self, port: int, host: str = TELEMETRY_HOST):
+        """
+        starts serving on the given port.
+        :param port: the port to listen on; 0 picks a free one (see self.port)
+        :param host: the address to listen on
+        """
+        self.host = host
+        self.port = port
+        self.status: Dict[str, Any] = {}
+        self.commands: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        started = threading.Event()
+        self.thread = threading.Thread(target=asyncio.run, args=(self._serve(started),), daemon=True,
+                                       name="telemetry")
+        self.thread.start()
+        started.wait()
+        if self.server is None:
+            raise OSError(f"The telemetry server couldn't listen on {host}:{port}.")
+
+    async def _serve(self, started: threading.Event):
+        self.loop = asyncio.get_running_loop()
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError:
+            started.set()  # with self.server still None, for the constructor to report.
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self.server = server
+        started.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # the headers don't matter; no request has a body.
+            if len(request_line) < 2:
+                code, body = 400, {"error": "bad request"}
+            else:
+                code, body = self._respond(request_line[0], request_line[1])
+            payload = json.dumps(body).encode()
+            writer.write(f"HTTP/1.1 {code} {'OK' if code == 200 else 'Error'}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method: str, path: str):
+        if method == "GET" and path.rstrip("/") in ("", "/status"):
+            return 200, self.status
+        if method == "POST" and path.startswith("/command/"):
+            command = path[len("/command/"):].strip("/")
+            if command in COMMANDS:
+                self.commands.put(command)
+                return 200, {"accepted": command}
+            return 404, {"error": f"unknown command '{command}'; expected one of {list(COMMANDS)}"}
+        return 404, {"error": f"nothing at {method} {path}"}
+
+    def publish(self, **status: Any):
+        """
+        updates the reported status with the given entries. The new status replaces the old one in one step, so the
+        server never sees a half-made one.
+        """
+        self.status = {**self.status, **status}
+
+    def pending_commands(self) -> List[str]:
+        """
+        :return: the commands received since the last call, oldest first.
+        """
+        commands = []
+        while True:
+            try:
+                commands.append(self.commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def close(self):
+        """
+        stops the server.
+        """
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+        self.thread.join(timeout=5)
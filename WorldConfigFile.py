@@ -0,0 +1,73 @@
+import random
+from typing import List, Tuple
+
+DEFAULT_WORLD_SIZE = 800
+DEFAULT_NUM_FEEDERS = 81
+DEFAULT_NUM_FOOD = 200
+DEFAULT_NUM_MOVING_DANGERS = 30
+DEFAULT_VIEWPORT_SIZE = 800  # the largest dimension, in pixels, of the simulation window.
+
+
+class WorldConfig:
+    """
+    Describes the arena the simulation runs in: its size, how many of each kind of entity it holds, and how the arena
+    is mapped onto the simulation window. Large arenas are shrunk to fit the viewport, so a 10000 x 10000 world can
+    still be watched in an 800-pixel window.
+    """
+
+    def __init__(self,
+                 width: int = DEFAULT_WORLD_SIZE,
+                 height: int = DEFAULT_WORLD_SIZE,
+                 num_feeders: int = DEFAULT_NUM_FEEDERS,
+                 num_food: int = DEFAULT_NUM_FOOD,
+                 num_moving_dangers: int = DEFAULT_NUM_MOVING_DANGERS,
+                 viewport_size: int = DEFAULT_VIEWPORT_SIZE):
+        if width <= 0 or height <= 0:
+            raise ValueError(f"The world must have a positive size, not {width} x {height}.")
+        if num_feeders <= 0:
+            raise ValueError(f"The world needs at least one feeder, not {num_feeders}.")
+        self.width = width
+        self.height = height
+        self.num_feeders = num_feeders
+        self.num_food = num_food
+        self.num_moving_dangers = num_moving_dangers
+
+        # the viewport: which part of the world is shown, and at what magnification. By default, the whole world is
+        # shown, shrunk (but never enlarged) to fit within viewport_size pixels.
+        self.zoom = min(1.0, viewport_size / max(width, height))
+        self.view_origin: List[float] = [0.0, 0.0]
+
+    def random_position(self, margin: int = 0) -> List[int]:
+        """
+        picks a random location in the world.
+        :param margin: how far the location must be from the edges of the world
+        :return: an [x, y] location in world coordinates.
+        """
+        return [random.randint(margin, self.width - margin), random.randint(margin, self.height - margin)]
+
+    def screen_size(self) -> Tuple[int, int]:
+        """
+        :return: the (width, height) in pixels of the simulation window needed to show the viewport.
+        """
+        return max(1, int(self.width * self.zoom)), max(1, int(self.height * self.zoom))
+
+    def to_screen(self, pos: Tuple[float, float] | List[float]) -> Tuple[int, int]:
+        """
+        converts a location in world coordinates to a pixel location in the simulation window.
+        :param pos: the (x, y) location in the world
+        :return: the (x, y) pixel location in the window.
+        """
+        return (int((pos[0] - self.view_origin[0]) * self.zoom),
+                int((pos[1] - self.view_origin[1]) * self.zoom))
+
+    def scale_length(self, length: float) -> int:
+        """
+        converts a distance in world coordinates to a number of pixels in the simulation window, keeping at least one
+        pixel so that small things stay visible when zoomed out.
+        :param length: the distance in the world
+        :return: the corresponding number of pixels.
+        """
+        return max(1, int(length * self.zoom))
+
+
+DEFAULT_WORLD = WorldConfig()